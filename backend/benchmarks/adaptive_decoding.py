@@ -0,0 +1,78 @@
+"""
+Greedy-first adaptive decoding vs always-beam on a local receipt fixture set.
+
+Uses the same fixtures as donut_quantization.py (receipt photos plus a
+labels.json of expected totals). For every receipt it runs the adaptive
+path (greedy, beam search only without a total or below
+DONUT_MIN_CONFIDENCE, 0 by default) and a plain DONUT_RETRY_BEAMS beam
+search. It reports median latency, total accuracy and how many receipts
+needed the retry.
+--min-confidence overrides the threshold to see where it should sit.
+Needs torch and transformers.
+
+Usage: python benchmarks/adaptive_decoding.py --fixtures receipts/ [--min-confidence 0.85]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# One receipt per generate() call, without the micro-batcher's wait
+os.environ["DONUT_BATCH_MAX_SIZE"] = "1"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import receipt_scanner
+from receipt_scanner import DonutReceiptScanner, preprocess_receipt
+from donut_quantization import load_fixtures, total_of
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--fixtures", required=True, help="Directory with receipt photos and labels.json")
+    parser.add_argument("--min-confidence", type=float, default=None)
+    parser.add_argument("--profile", default=None, help="Preprocessing profile (default: PREPROCESS_PROFILE)")
+    parser.add_argument("--max-length", type=int, default=768)
+    args = parser.parse_args()
+
+    if args.min_confidence is not None:
+        receipt_scanner.DONUT_MIN_CONFIDENCE = args.min_confidence
+    beams = receipt_scanner.DONUT_RETRY_BEAMS
+
+    fixtures = load_fixtures(args.fixtures)
+    scanner = DonutReceiptScanner()
+
+    timings = {"adaptive": [], f"beam{beams}": []}
+    correct = {name: 0 for name in timings}
+    confidences = []
+    for name, (image, label) in fixtures.items():
+        pixels = preprocess_receipt(image, args.profile, scanner.input_size)
+        pixel_values = scanner.processor(pixels, return_tensors="pt").pixel_values
+
+        started = time.perf_counter()
+        adaptive = scanner.generate_batch([(pixel_values, args.max_length)])[0]
+        timings["adaptive"].append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        beam = scanner._decode(pixel_values, args.max_length, num_beams=beams)[0]
+        timings[f"beam{beams}"].append((time.perf_counter() - started) * 1000)
+
+        for mode, result in (("adaptive", adaptive), (f"beam{beams}", beam)):
+            if not isinstance(result, Exception):
+                correct[mode] += abs(total_of(result) - float(label["total"])) < 0.005
+        if not isinstance(adaptive, Exception):
+            confidences.append(adaptive["confidence"])
+
+    print(f"{len(fixtures)} receipts, min confidence {receipt_scanner.DONUT_MIN_CONFIDENCE}")
+    print(f"{'decoding':<9} {'median ms':>10} {'mean ms':>8} {'total acc':>10}")
+    for mode, samples in timings.items():
+        print(f"{mode:<9} {statistics.median(samples):>10.0f} {statistics.mean(samples):>8.0f} "
+              f"{correct[mode] / len(fixtures):>10.0%}")
+    print(f"beam retries: {scanner.beam_retries}/{scanner.greedy_decodes} receipts")
+    if confidences:
+        print(f"final confidence: median {statistics.median(confidences):.3f}, min {min(confidences):.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Time the scalar and NumPy balance computations.
+
+Times both paths on synthetic histories, with the vectorized cost per
+expense; VECTORIZE_MIN_EXPENSES is chosen from this. Parity between the
+two paths is tested in tests/test_balance_paths.py.
+
+Usage: python benchmarks/balance_paths.py [--sizes 1000 10000 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from settlement_optimizer import SettlementOptimizer
+
+
+def time_paths(rng: random.Random, size: int, users: int = 40):
+    members = [f"user_{i}" for i in range(users)]
+    expenses = []
+    for _ in range(size):
+        split_between = rng.sample(members, rng.randint(2, 10))
+        expenses.append({
+            "paid_by": rng.choice(split_between),
+            "amount": rng.randint(100, 1_000_000) / 100,
+            "split_between": split_between
+        })
+
+    started = time.perf_counter()
+    scalar = SettlementOptimizer.calculate_balances_scalar(expenses)
+    scalar_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    vectorized = SettlementOptimizer.calculate_balances_vectorized(expenses)
+    vectorized_ms = (time.perf_counter() - started) * 1000
+
+    same = "yes" if scalar == vectorized else "NO"
+    print(f"{size:>9} {scalar_ms:>10.1f} {vectorized_ms:>13.1f} {scalar_ms / vectorized_ms:>8.1f}x "
+          f"{vectorized_ms * 1000 / size:>11.2f} {same:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 5_000, 10_000, 100_000, 300_000])
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'expenses':>9} {'scalar ms':>10} {'vectorized ms':>13} {'speed-up':>9} {'us/expense':>11} {'identical':>10}")
+    for size in args.sizes:
+        time_paths(rng, size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Peak memory and time of decoding one receipt upload, old vs bounded decode.
+
+Each measurement runs in a fresh interpreter and reports the growth of
+peak RSS caused by the decode alone, on top of the imports (Linux only).
+"full" is the previous Image.open(...).convert("RGB") at full
+resolution; "bounded" is decode_receipt_image() (draft-mode JPEG,
+immediate downscale otherwise) to RGB and to grayscale, which is what
+the scanner decodes to. Multiply the bounded figure, plus the
+upload itself (MAX_UPLOAD_BYTES), by the number of concurrent scans
+(INFERENCE_WORKERS) for a per-worker decode budget.
+
+Usage: python benchmarks/decode_memory.py [--size 4000x3000] [--formats JPEG PNG]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Peak RSS is read from VmHWM: ru_maxrss survives fork+exec, so a child
+# would report the parent's peak if the parent had grown larger
+PROBE = """
+import io, json, sys, time
+from PIL import Image
+from receipt_scanner import decode_receipt_image
+
+def peak_kb():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+
+data = open(sys.argv[1], "rb").read()
+before = peak_kb()
+started = time.perf_counter()
+if sys.argv[2] == "full":
+    image = Image.open(io.BytesIO(data)).convert("RGB")
+else:
+    image = decode_receipt_image(data, mode=sys.argv[3])
+elapsed = time.perf_counter() - started
+after = peak_kb()
+print(json.dumps({"mb": (after - before) / 1024, "ms": elapsed * 1000, "size": image.size}))
+"""
+
+
+def make_photo(width: int, height: int, fmt: str, path: str):
+    rng = np.random.default_rng(0)
+    # Smooth paper texture plus noise, so the encoded size resembles a real photo
+    base = np.linspace(200, 240, width, dtype=np.float32)[None, :, None]
+    pixels = np.clip(base + rng.normal(0, 12, (height, width, 3)), 0, 255).astype(np.uint8)
+    Image.fromarray(pixels).save(path, format=fmt, **({"quality": 90} if fmt == "JPEG" else {}))
+
+
+def measure(path: str, decode: str, mode: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, path, decode, mode], cwd=BACKEND_DIR,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", default="4000x3000", help="Photo size, WIDTHxHEIGHT")
+    parser.add_argument("--formats", nargs="+", default=["JPEG", "PNG"])
+    args = parser.parse_args()
+    width, height = (int(part) for part in args.size.lower().split("x"))
+
+    print(f"{'format':<6} {'file MB':>8} {'decode':<12} {'peak MB':>8} {'ms':>7}  result")
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in args.formats:
+            path = os.path.join(tmp, f"receipt.{fmt.lower()}")
+            make_photo(width, height, fmt, path)
+            file_mb = os.path.getsize(path) / 1e6
+            for decode, mode in (("full", "RGB"), ("bounded", "RGB"), ("bounded", "L")):
+                result = measure(path, decode, mode)
+                label = decode if decode == "full" else f"{decode} {mode}"
+                print(f"{fmt:<6} {file_mb:>8.1f} {label:<12} {result['mb']:>8.0f} {result['ms']:>7.0f}  "
+                      f"{result['size'][0]}x{result['size'][1]}")
+
+
+if __name__ == "__main__":
+    main()
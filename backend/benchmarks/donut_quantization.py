@@ -0,0 +1,112 @@
+"""
+Donut fp32 vs int8 (dynamic quantization) on a local receipt fixture set: latency and accuracy.
+
+The fixture directory holds receipt photos and a labels.json mapping
+each file name to its expected total, or to {"total": ..., "vendor": ...}.
+Photos are git-ignored, so the set stays local. Each precision is loaded
+in turn (int8 load time includes the conversion) and every receipt is
+scanned --runs times, one at a time with batching off.
+
+Reports median per-receipt latency, total and vendor accuracy, the
+int8 speed-up, and on how many receipts both precisions extracted the
+same total. Needs torch and transformers.
+
+Usage: python benchmarks/donut_quantization.py --fixtures receipts/ [--runs 3] [--threads 4]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+# One receipt per generate() call; the micro-batcher would add its wait to every scan
+os.environ["DONUT_BATCH_MAX_SIZE"] = "1"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from receipt_scanner import DonutReceiptScanner, decode_receipt_image
+
+
+def load_fixtures(directory: str) -> dict:
+    with open(os.path.join(directory, "labels.json")) as f:
+        labels = json.load(f)
+    fixtures = {}
+    for name, label in labels.items():
+        if not isinstance(label, dict):
+            label = {"total": label}
+        with open(os.path.join(directory, name), "rb") as f:
+            fixtures[name] = (decode_receipt_image(f.read(), mode="L"), label)
+    return fixtures
+
+
+def total_of(result: dict) -> float:
+    try:
+        return float(result.get("total_amount", 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def evaluate(precision: str, fixtures: dict, args) -> dict:
+    started = time.perf_counter()
+    scanner = DonutReceiptScanner(precision=precision)
+    load_seconds = time.perf_counter() - started
+
+    # First scan pays for lazy initialization and is not timed
+    first_image = next(iter(fixtures.values()))[0]
+    scanner.extract_receipt_from_pil(first_image, profile=args.profile)
+
+    latencies = []
+    totals = {}
+    correct_totals = correct_vendors = vendor_labels = 0
+    for name, (image, label) in fixtures.items():
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            result = scanner.extract_receipt_from_pil(image, profile=args.profile)
+            latencies.append((time.perf_counter() - started) * 1000)
+        totals[name] = total_of(result)
+        correct_totals += abs(totals[name] - float(label["total"])) < 0.005
+        if label.get("vendor"):
+            vendor_labels += 1
+            correct_vendors += label["vendor"].lower() in str(result.get("store_name", "")).lower()
+
+    return {
+        "load_seconds": load_seconds,
+        "median_ms": statistics.median(latencies),
+        "total_accuracy": correct_totals / len(fixtures),
+        "vendor_accuracy": correct_vendors / vendor_labels if vendor_labels else None,
+        "totals": totals,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--fixtures", required=True, help="Directory with receipt photos and labels.json")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--profile", default=None, help="Preprocessing profile (default: PREPROCESS_PROFILE)")
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads (default: torch's)")
+    args = parser.parse_args()
+
+    if args.threads:
+        import torch
+        torch.set_num_threads(args.threads)
+
+    fixtures = load_fixtures(args.fixtures)
+    print(f"{len(fixtures)} receipts, {args.runs} runs each")
+
+    results = {precision: evaluate(precision, fixtures, args) for precision in ("fp32", "int8")}
+
+    print(f"{'precision':<9} {'load s':>7} {'ms/receipt':>11} {'total acc':>10} {'vendor acc':>11}")
+    for precision, result in results.items():
+        vendor = "n/a" if result["vendor_accuracy"] is None else f"{result['vendor_accuracy']:.0%}"
+        print(f"{precision:<9} {result['load_seconds']:>7.1f} {result['median_ms']:>11.0f} "
+              f"{result['total_accuracy']:>10.0%} {vendor:>11}")
+
+    fp32, int8 = results["fp32"], results["int8"]
+    agreement = sum(abs(fp32["totals"][name] - int8["totals"][name]) < 0.005 for name in fixtures)
+    print(f"int8 speed-up: {fp32['median_ms'] / int8['median_ms']:.2f}x, "
+          f"same total as fp32 on {agreement}/{len(fixtures)} receipts")
+
+
+if __name__ == "__main__":
+    main()
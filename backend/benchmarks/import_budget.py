@@ -0,0 +1,95 @@
+"""
+Cold-start check: importing the API must stay fast and must not pull in the OCR stack.
+
+Imports main in fresh interpreters and fails (exit code 1) if any heavy
+ML module ends up in sys.modules or if the median import time exceeds
+the budget. tests/test_import_budget.py runs the same check under
+pytest; this script adds --profile, which prints the slowest imports
+from python -X importtime, for finding what regressed.
+
+Usage: python benchmarks/import_budget.py [--budget-ms 1000] [--runs 5] [--profile]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that may only be imported on the first scan, warm-up or model load
+DEFERRED_MODULES = ["torch", "transformers", "cv2", "easyocr", "requests", "sentence_transformers"]
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import main
+elapsed = time.perf_counter() - started
+print(json.dumps({
+    "ms": elapsed * 1000,
+    "loaded": [name for name in %r if name in sys.modules]
+}))
+""" % (DEFERRED_MODULES,)
+
+
+def probe_env() -> dict:
+    # Memory storage keeps the probe from creating a database file
+    return dict(os.environ, STORAGE_BACKEND="memory")
+
+
+def run_probe() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=BACKEND_DIR, env=probe_env(),
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def print_profile(top: int):
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"], cwd=BACKEND_DIR, env=probe_env(),
+        capture_output=True, text=True, check=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            rows.append((int(cumulative), name.rstrip()))
+    print("\nSlowest imports (cumulative):")
+    for cumulative, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative / 1000:>9.1f} ms {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", "1000")))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--profile", action="store_true")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    # The first run also warms the bytecode cache and is not counted
+    results = [run_probe() for _ in range(args.runs + 1)][1:]
+    median_ms = statistics.median(r["ms"] for r in results)
+    loaded = sorted({name for r in results for name in r["loaded"]})
+
+    print(f"import main: median {median_ms:.0f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    failed = False
+    if loaded:
+        print(f"FAIL: deferred modules imported at startup: {', '.join(loaded)}")
+        failed = True
+    if median_ms > args.budget_ms:
+        print("FAIL: import time over budget")
+        failed = True
+    if args.profile or failed:
+        print_profile(args.top)
+    if failed:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
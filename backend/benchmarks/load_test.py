@@ -0,0 +1,147 @@
+"""
+Throughput of non-OCR endpoints for 1, 2, 4... serve.py workers.
+
+Starts serve.py on a fresh SQLite file for each worker count, seeds a
+group with expenses, then drives it from client processes with
+keep-alive connections. The mix is GET /groups/{id}, a 50-row expense
+page and POST /expenses/manual with an explicit category. Reports
+requests per second and the speed-up over one worker.
+
+Models are not loaded (CATEGORIZER_USE_LLM=false, WARM_UP_MODELS=false);
+this measures the web/storage path only.
+
+Usage: python benchmarks/load_test.py [--workers 1 2 4] [--clients 16] [--seconds 10]
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def request(conn: http.client.HTTPConnection, method: str, path: str, body=None):
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    response = conn.getresponse()
+    data = response.read()
+    if response.status >= 400:
+        raise RuntimeError(f"{method} {path} -> {response.status}: {data[:200]}")
+    return json.loads(data)
+
+
+def wait_until_up(port: int, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            request(conn, "GET", "/")
+            conn.close()
+            return
+        except (OSError, RuntimeError, http.client.HTTPException):
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not come up")
+
+
+def seed(port: int) -> str:
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    members = [{"id": f"user_{i}", "name": f"User {i}", "email": f"user{i}@example.com"} for i in range(6)]
+    group_id = request(conn, "POST", "/groups/create", {"name": "Load test", "members": members})["data"]["group"]["id"]
+    rows = [{
+        "description": f"Seed expense {i}",
+        "amount": 10 + i % 90,
+        "paid_by_user_id": f"user_{i % 6}",
+        "split_among_user_ids": [m["id"] for m in members],
+        "category": "Food & Groceries"
+    } for i in range(2000)]
+    request(conn, "POST", f"/expenses/bulk?group_id={group_id}", rows)
+    conn.close()
+    return group_id
+
+
+def client(port: int, group_id: str, seconds: float, results):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    manual = {
+        "description": "Coffee",
+        "amount": 4.5,
+        "paid_by_user_id": "user_0",
+        "split_among_user_ids": ["user_0", "user_1"],
+        "group_id": group_id,
+        "category": "Food & Groceries"
+    }
+    done = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        step = done % 4
+        if step == 0:
+            request(conn, "GET", f"/groups/{group_id}")
+        elif step == 1:
+            request(conn, "GET", f"/groups/{group_id}/expenses?limit=50&fields=summary")
+        elif step == 2:
+            request(conn, "POST", "/expenses/manual", manual)
+        else:
+            request(conn, "GET", "/categories")
+        done += 1
+    conn.close()
+    results.put(done)
+
+
+def run(workers: int, port: int, args) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            STORAGE_BACKEND="sqlite",
+            STORAGE_PATH=os.path.join(tmp, "load.db"),
+            CATEGORIZER_USE_LLM="false",
+            WARM_UP_MODELS="false",
+        )
+        server = subprocess.Popen(
+            [sys.executable, "serve.py", "--workers", str(workers), "--host", "127.0.0.1",
+             "--port", str(port), "--log-level", "warning", "--no-access-log"],
+            cwd=BACKEND_DIR, env=env
+        )
+        try:
+            wait_until_up(port)
+            group_id = seed(port)
+
+            results = multiprocessing.Queue()
+            clients = [
+                multiprocessing.Process(target=client, args=(port, group_id, args.seconds, results))
+                for _ in range(args.clients)
+            ]
+            started = time.perf_counter()
+            for process in clients:
+                process.start()
+            total = sum(results.get() for _ in clients)
+            for process in clients:
+                process.join()
+            return total / (time.perf_counter() - started)
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"{'workers':>7} {'req/s':>10} {'speed-up':>9}")
+    baseline = None
+    for workers in args.workers:
+        throughput = run(workers, args.port, args)
+        baseline = baseline or throughput
+        print(f"{workers:>7} {throughput:>10.0f} {throughput / baseline:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Preprocessing cost per profile, and Donut extraction accuracy when labelled receipts are given.
+
+Times preprocess_receipt() for each profile in PREPROCESS_PROFILES
+against the previous full-resolution pipeline (OpenCV threshold and
+NL-means denoise, then PIL contrast, sharpness and unsharp mask) on
+synthetic phone-sized receipt photos, or on --images if given. Each
+profile's output is also compared with the legacy output shrunk to the
+same size: the mean absolute gray-level difference and the share of
+pixels that end up on the other side of mid-gray (ink vs paper).
+
+With --labels (a JSON object mapping file name to the expected total)
+each profile is also run through the Donut model and scored on how many
+totals it extracts exactly; this needs torch and transformers.
+
+Usage: python benchmarks/preprocess_profiles.py [--size 3000x4000] [--count 5] [--runs 3]
+       python benchmarks/preprocess_profiles.py --images receipts/ --labels receipts/labels.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageEnhance, ImageFilter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from receipt_scanner import PREPROCESS_PROFILES, preprocess_receipt
+
+
+def legacy_preprocess(image: Image.Image) -> Image.Image:
+    """The pipeline used before profiles: every step at full photo resolution"""
+    import cv2
+
+    gray = cv2.cvtColor(np.array(image.convert("RGB")), cv2.COLOR_RGB2GRAY)
+    gray = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+    gray = cv2.fastNlMeansDenoising(gray, None, 10, 7, 21)
+    image = Image.fromarray(gray).convert("RGB")
+    image = ImageEnhance.Contrast(image).enhance(2.0)
+    image = ImageEnhance.Sharpness(image).enhance(2.0)
+    return image.filter(ImageFilter.UnsharpMask(radius=2, percent=150, threshold=3))
+
+
+def synthetic_receipt(width: int, height: int, seed: int) -> Image.Image:
+    """A receipt-like photo: printed lines on paper, uneven lighting and sensor noise"""
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    paper = np.full((height, width), 235, dtype=np.uint8)
+    scale = width / 1000
+    y = int(120 * scale)
+    while y < height - 80 * scale:
+        text = f"ITEM {rng.integers(100, 999)}  QTY {rng.integers(1, 5)}   {rng.integers(1, 999)}.{rng.integers(0, 99):02d}"
+        cv2.putText(paper, text, (int(60 * scale), y), cv2.FONT_HERSHEY_SIMPLEX,
+                    1.1 * scale, 30, max(1, int(2 * scale)), cv2.LINE_AA)
+        y += int(55 * scale)
+    # Light falls off across the photo
+    gradient = np.linspace(1.0, 0.6, width, dtype=np.float32)[None, :]
+    photo = paper.astype(np.float32) * gradient + rng.normal(0, 8, paper.shape)
+    return Image.fromarray(np.clip(photo, 0, 255).astype(np.uint8)).convert("RGB")
+
+
+def time_ms(fn, image: Image.Image, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn(image)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def difference_from_legacy(output: np.ndarray, legacy: Image.Image):
+    """(mean absolute difference, share of pixels flipped between ink and paper)"""
+    import cv2
+
+    height, width = output.shape[:2]
+    reference = np.asarray(legacy.convert("L"))
+    if reference.shape != (height, width):
+        reference = cv2.resize(reference, (width, height), interpolation=cv2.INTER_AREA)
+    gray = np.asarray(Image.fromarray(output).convert("L"))
+    mean_abs = float(np.abs(gray.astype(np.int16) - reference).mean())
+    flipped = float(((gray < 128) != (reference < 128)).mean())
+    return mean_abs, flipped
+
+
+def load_images(args) -> dict:
+    if args.images:
+        names = sorted(
+            name for name in os.listdir(args.images)
+            if name.lower().endswith((".jpg", ".jpeg", ".png", ".webp"))
+        )
+        return {name: Image.open(os.path.join(args.images, name)).convert("RGB") for name in names}
+    width, height = (int(part) for part in args.size.lower().split("x"))
+    return {f"synthetic_{i}": synthetic_receipt(width, height, seed=i) for i in range(args.count)}
+
+
+def accuracy(images: dict, labels: dict, profile: str, scanner) -> float:
+    correct = 0
+    for name, expected in labels.items():
+        result = scanner.extract_receipt_from_pil(images[name], profile=profile)
+        try:
+            correct += abs(float(result.get("total_amount", 0)) - float(expected)) < 0.005
+        except (TypeError, ValueError):
+            pass
+    return correct / len(labels)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", help="Directory of receipt photos (default: synthetic)")
+    parser.add_argument("--labels", help="JSON file mapping image file name to expected total")
+    parser.add_argument("--size", default="3000x4000", help="Synthetic photo size, WIDTHxHEIGHT")
+    parser.add_argument("--count", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    images = load_images(args)
+    labels = None
+    scanner = None
+    if args.labels:
+        with open(args.labels) as f:
+            labels = {name: total for name, total in json.load(f).items() if name in images}
+        from receipt_scanner import DonutReceiptScanner
+        scanner = DonutReceiptScanner()
+
+    pipelines = {"legacy (full res)": legacy_preprocess}
+    for profile in PREPROCESS_PROFILES:
+        pipelines[profile] = lambda image, profile=profile: preprocess_receipt(image, profile)
+
+    sample = next(iter(images.values()))
+    print(f"{len(images)} images, e.g. {sample.width}x{sample.height}")
+    legacy = {image_name: legacy_preprocess(image) for image_name, image in images.items()}
+    print(f"{'pipeline':<18} {'ms/image':>9} {'mean diff':>10} {'flipped':>8} {'accuracy':>9}")
+    for name, fn in pipelines.items():
+        ms = statistics.mean(time_ms(fn, image, args.runs) for image in images.values())
+        mean_diff = flipped = "n/a"
+        if name in PREPROCESS_PROFILES:
+            diffs = [difference_from_legacy(fn(image), legacy[image_name]) for image_name, image in images.items()]
+            mean_diff = f"{statistics.mean(d[0] for d in diffs):.1f}"
+            flipped = f"{statistics.mean(d[1] for d in diffs):.1%}"
+        score = "n/a"
+        if labels and name in PREPROCESS_PROFILES:
+            score = f"{accuracy(images, labels, name, scanner):.0%}"
+        print(f"{name:<18} {ms:>9.1f} {mean_diff:>10} {flipped:>8} {score:>9}")
+
+
+if __name__ == "__main__":
+    main()
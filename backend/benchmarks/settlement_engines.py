@@ -0,0 +1,94 @@
+"""
+Compare the greedy and exact settlement engines.
+
+Generates groups of 5-40 users in two shapes and reports the number of
+transfers and the runtime of each engine:
+
+  random     - balances from random shared expenses (rarely decomposable)
+  clustered  - users form small sub-groups that settle among themselves,
+               the case where greedy over-pays most
+
+Usage: python benchmarks/settlement_engines.py [--trials 20] [--budget-ms 200]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from settlement_optimizer import SettlementOptimizer
+
+GROUP_SIZES = [5, 10, 15, 20, 25, 30, 35, 40]
+
+
+def random_balances(rng: random.Random, users: int) -> dict:
+    members = [f"user_{i}" for i in range(users)]
+    expenses = []
+    for _ in range(users * 3):
+        split_between = rng.sample(members, rng.randint(2, users))
+        expenses.append({
+            "paid_by": rng.choice(split_between),
+            "amount": rng.randint(100, 50000) / 100,
+            "split_between": split_between
+        })
+    return SettlementOptimizer.calculate_balances(expenses)
+
+
+def clustered_balances(rng: random.Random, users: int) -> dict:
+    """Balances in cents, as SettlementOptimizer works on"""
+    balances = {}
+    index = 0
+    while index < users:
+        size = min(rng.randint(2, 4), users - index)
+        if users - index - size == 1:
+            size += 1
+        amounts = [rng.randint(-50000, 50000) for _ in range(size - 1)]
+        amounts.append(-sum(amounts))
+        for amount in amounts:
+            balances[f"user_{index}"] = amount
+            index += 1
+    return balances
+
+
+def run_engine(balances: dict, engine: str, budget_ms: float):
+    started = time.perf_counter()
+    result = SettlementOptimizer.settle_balances(balances, engine, budget_ms)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    return len(result["optimal_settlements"]), elapsed_ms, result["engine"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--trials", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=200.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'shape':<10} {'users':>5} {'greedy tx':>10} {'exact tx':>9} "
+          f"{'greedy ms':>10} {'exact ms':>9} {'fallbacks':>9}")
+
+    for shape, generate in (("random", random_balances), ("clustered", clustered_balances)):
+        for users in GROUP_SIZES:
+            greedy_tx = exact_tx = 0
+            greedy_ms = exact_ms = 0.0
+            fallbacks = 0
+            for _ in range(args.trials):
+                balances = generate(rng, users)
+                tx, ms, _ = run_engine(balances, "greedy", args.budget_ms)
+                greedy_tx += tx
+                greedy_ms += ms
+                tx, ms, engine_used = run_engine(balances, "exact", args.budget_ms)
+                exact_tx += tx
+                exact_ms += ms
+                fallbacks += engine_used != "exact"
+
+            n = args.trials
+            print(f"{shape:<10} {users:>5} {greedy_tx / n:>10.1f} {exact_tx / n:>9.1f} "
+                  f"{greedy_ms / n:>10.2f} {exact_ms / n:>9.2f} {fallbacks:>9}")
+
+
+if __name__ == "__main__":
+    main()
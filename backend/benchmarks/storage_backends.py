@@ -0,0 +1,116 @@
+"""
+Write and read throughput of the memory and SQLite repositories.
+
+For each backend: single-expense writes (one transaction each, as
+/expenses/manual does), batched writes (as /expenses/bulk does), page
+reads, full-group streaming and balance reads from several threads.
+SQLite runs on a temporary file unless --path is given.
+
+Usage: python benchmarks/storage_backends.py [--single 2000] [--batch 50000] [--threads 8]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import create_repository
+from ids import new_expense_id
+
+MEMBERS = [{"id": f"user_{i}", "name": f"User {i}", "email": f"user{i}@example.com"} for i in range(8)]
+CATEGORIES = ["Food & Groceries", "Travel & Trips", "Housing & Shared Living", "Events & Entertainment"]
+
+
+def make_expense(rng: random.Random, number: int, group_id: str) -> dict:
+    split_between = [m["id"] for m in rng.sample(MEMBERS, rng.randint(2, len(MEMBERS)))]
+    return {
+        "id": new_expense_id(),
+        "description": f"Expense {number}",
+        "amount": rng.randint(100, 500000) / 100,
+        "paid_by_user_id": rng.choice(split_between),
+        "split_among_user_ids": split_between,
+        "group_id": group_id,
+        "category": rng.choice(CATEGORIES),
+        "created_at": datetime.now().isoformat()
+    }
+
+
+def rate(count: int, seconds: float) -> str:
+    return f"{count / seconds:>12,.0f}/s"
+
+
+def run(backend: str, path: str, args, rng: random.Random):
+    repository = create_repository(backend, path)
+    groups = [f"group_{i}" for i in range(1, 5)]
+    for group_id in groups:
+        repository.create_group({
+            "id": group_id, "name": group_id, "members": MEMBERS,
+            "created_at": datetime.now().isoformat(), "total_expenses": 0, "total_amount": 0.0
+        })
+    number = 0
+
+    started = time.perf_counter()
+    for _ in range(args.single):
+        number += 1
+        repository.add_expenses([make_expense(rng, number, rng.choice(groups))])
+    print(f"{backend:<7} single writes     {rate(args.single, time.perf_counter() - started)}")
+
+    batch = []
+    for _ in range(args.batch):
+        number += 1
+        batch.append(make_expense(rng, number, groups[0]))
+    started = time.perf_counter()
+    repository.add_expenses(batch)
+    print(f"{backend:<7} batched writes    {rate(args.batch, time.perf_counter() - started)}")
+
+    def read_pages(_):
+        after_id = None
+        rows = 0
+        for _ in range(20):
+            page, after_id = repository.group_page(groups[0], 50, after_id)
+            rows += len(page)
+            if after_id is None:
+                break
+        return rows
+
+    with ThreadPoolExecutor(args.threads) as pool:
+        started = time.perf_counter()
+        rows = sum(pool.map(read_pages, range(args.threads * 10)))
+    print(f"{backend:<7} page reads        {rate(rows, time.perf_counter() - started)} rows "
+          f"({args.threads} threads)")
+
+    started = time.perf_counter()
+    rows = sum(1 for _ in repository.iter_group_expenses(groups[0], newest_first=True))
+    print(f"{backend:<7} stream group      {rate(rows, time.perf_counter() - started)} rows")
+
+    with ThreadPoolExecutor(args.threads) as pool:
+        started = time.perf_counter()
+        lookups = args.threads * 500
+        list(pool.map(lambda i: repository.balances(groups[i % len(groups)]), range(lookups)))
+    print(f"{backend:<7} balance reads     {rate(lookups, time.perf_counter() - started)}")
+
+    repository.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--single", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=50000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--path", default=None, help="SQLite file (default: temporary)")
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.path or os.path.join(tmp, "bench.db")
+        for backend in ("memory", "sqlite"):
+            run(backend, path, args, random.Random(args.seed))
+
+
+if __name__ == "__main__":
+    main()
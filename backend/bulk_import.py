@@ -0,0 +1,186 @@
+import codecs
+import csv
+import io
+import json
+import math
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+# Columns accepted in a CSV upload; split_among_user_ids holds ids separated by ';' or '|'
+CSV_COLUMNS = ("description", "amount", "paid_by_user_id", "split_among_user_ids", "group_id", "category")
+
+# Validation stops collecting errors after this many, the set is rejected either way
+MAX_REPORTED_ERRORS = 100
+
+
+class BulkImportError(Exception):
+    """Raised when a bulk upload cannot be parsed or holds too many rows"""
+
+    def __init__(self, message: str, too_large: bool = False):
+        super().__init__(message)
+        self.too_large = too_large
+
+
+async def limit_body(chunks: AsyncIterator[bytes], max_bytes: int) -> AsyncIterator[bytes]:
+    """Pass a request body through, failing once it exceeds max_bytes"""
+    total = 0
+    async for chunk in chunks:
+        total += len(chunk)
+        if total > max_bytes:
+            raise BulkImportError(f"Upload exceeds {max_bytes // 1024} KB", too_large=True)
+        yield chunk
+
+
+async def read_body(chunks: AsyncIterator[bytes], max_bytes: int) -> bytes:
+    """Buffer a request body of at most max_bytes"""
+    return b"".join([chunk async for chunk in limit_body(chunks, max_bytes)])
+
+
+async def read_csv_rows(chunks: AsyncIterator[bytes], max_rows: int) -> List[Dict]:
+    """Parse a streamed CSV body into row dicts without buffering the whole upload.
+
+    Chunks are decoded incrementally and the text up to the last newline
+    outside quotes is handed to the csv module, so quoted fields may span
+    chunk boundaries and lines. Line splitting is left to csv itself, so
+    characters such as \u2028 inside a field never split a row.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    header: Optional[List[str]] = None
+    rows: List[Dict] = []
+
+    def consume(block: str):
+        nonlocal header
+        for values in csv.reader(io.StringIO(block, newline="")):
+            if not values or not any(v.strip() for v in values):
+                continue
+            if header is None:
+                header = [name.strip() for name in values]
+                missing = {"description", "amount", "paid_by_user_id", "split_among_user_ids"} - set(header)
+                if missing:
+                    raise BulkImportError(f"CSV header is missing columns: {', '.join(sorted(missing))}")
+                continue
+            if len(rows) >= max_rows:
+                raise BulkImportError(f"Upload exceeds {max_rows} rows", too_large=True)
+            row = dict(zip(header, values))
+            split = row.get("split_among_user_ids") or ""
+            row["split_among_user_ids"] = [uid.strip() for uid in split.replace("|", ";").split(";") if uid.strip()]
+            rows.append(row)
+
+    def split_complete(text: str) -> Tuple[str, str]:
+        """Split text after its last newline outside quotes (an even number of quotes before it)"""
+        end = text.rfind("\n")
+        quotes = text.count('"', 0, end) if end >= 0 else 0
+        while end >= 0 and quotes % 2:
+            previous = text.rfind("\n", 0, end)
+            quotes -= text.count('"', previous + 1, end)
+            end = previous
+        return text[:end + 1], text[end + 1:]
+
+    try:
+        async for chunk in chunks:
+            pending += decoder.decode(chunk)
+            if "\n" not in pending:
+                continue
+            block, pending = split_complete(pending)
+            if block:
+                consume(block)
+        pending += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise BulkImportError("CSV body must be UTF-8")
+    except csv.Error as e:
+        raise BulkImportError(f"Malformed CSV: {e}")
+
+    if pending.strip():
+        consume(pending)
+    if header is None:
+        raise BulkImportError("CSV body is empty")
+    return rows
+
+
+def parse_json_rows(body: bytes, max_rows: int) -> List[Dict]:
+    """Accept either a JSON array of expenses or {"expenses": [...]}"""
+    try:
+        payload = json.loads(body)
+    except ValueError as e:
+        raise BulkImportError(f"Invalid JSON: {e}")
+
+    if isinstance(payload, dict):
+        payload = payload.get("expenses")
+    if not isinstance(payload, list):
+        raise BulkImportError("Expected a JSON array of expenses or an object with an 'expenses' array")
+    if len(payload) > max_rows:
+        raise BulkImportError(f"Upload exceeds {max_rows} rows", too_large=True)
+    return payload
+
+
+def validate_rows(rows: List[Dict], known_groups, default_group_id: Optional[str] = None) -> Tuple[List[Dict], List[Dict]]:
+    """Validate rows as one set, with the same rules as ExpenseCreate.
+
+    Returns (expenses, errors); expenses are normalized dicts without id or
+    created_at. Callers should store nothing when errors is non-empty.
+    """
+    expenses = []
+    errors = []
+
+    def fail(row_number: int, message: str):
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({"row": row_number, "error": message})
+
+    for row_number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            fail(row_number, "row must be an object")
+            continue
+
+        description = row.get("description")
+        if not isinstance(description, str) or not description.strip():
+            fail(row_number, "description is required")
+            continue
+
+        amount = row.get("amount")
+        try:
+            # bool is an int subclass; float(True) would be accepted as 1.0
+            if isinstance(amount, bool):
+                raise TypeError
+            amount = float(amount)
+        except (TypeError, ValueError):
+            fail(row_number, "amount must be a number")
+            continue
+        if not math.isfinite(amount) or amount <= 0:
+            fail(row_number, "amount must be greater than 0")
+            continue
+
+        paid_by = row.get("paid_by_user_id")
+        if not isinstance(paid_by, str) or not paid_by:
+            fail(row_number, "paid_by_user_id is required")
+            continue
+
+        split_users = row.get("split_among_user_ids")
+        if (not isinstance(split_users, list) or not split_users
+                or not all(isinstance(uid, str) and uid for uid in split_users)):
+            fail(row_number, "split_among_user_ids must be a non-empty list of user ids")
+            continue
+
+        group_id = row.get("group_id")
+        if group_id is not None and not isinstance(group_id, str):
+            fail(row_number, "group_id must be a string")
+            continue
+        group_id = group_id or default_group_id
+        if group_id not in known_groups:
+            fail(row_number, f"group '{group_id}' not found" if group_id else "group_id is required")
+            continue
+
+        category = row.get("category") or None
+        if category is not None and not isinstance(category, str):
+            fail(row_number, "category must be a string")
+            continue
+
+        expenses.append({
+            "description": description,
+            "amount": amount,
+            "paid_by_user_id": paid_by,
+            "split_among_user_ids": split_users,
+            "group_id": group_id,
+            "category": category
+        })
+
+    return expenses, errors
@@ -1,7 +1,13 @@
 import re 
 import numpy as np
 from typing import List, Dict, Optional
+import hashlib
+import json
 import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -9,16 +15,13 @@ logger = logging.getLogger(__name__)
 # Import ML dependencies only when needed
 HAS_ML_DEPS = True
 SentenceTransformer = None
-cosine_similarity = None
 
 def _load_ml_dependencies():
-    global SentenceTransformer, cosine_similarity, HAS_ML_DEPS
+    global SentenceTransformer, HAS_ML_DEPS
     if SentenceTransformer is None:
         try:
             from sentence_transformers import SentenceTransformer as ST
-            from sklearn.metrics.pairwise import cosine_similarity as cs
             SentenceTransformer = ST
-            cosine_similarity = cs
             logger.info("ML dependencies loaded successfully")
         except ImportError as e:
             HAS_ML_DEPS = False
@@ -26,6 +29,190 @@ def _load_ml_dependencies():
             return False
     return HAS_ML_DEPS
 
+class KeywordMatcher:
+    """Finds every keyword occurrence in one pass over the text (Aho-Corasick).
+
+    Keywords only match whole words or phrases: "rent" does not match
+    "rental" and "bus" does not match "business", so inflected forms
+    are listed as keywords of their own.
+    scores() sums the weight of each hit per category, so the cost stays
+    O(len(text) + hits) however many keywords or vendor names are loaded.
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Keywords ending at each state; _output adds those reached through
+        # failure links and is recomputed from scratch by build()
+        self._keywords: List[List[tuple]] = [[]]
+        self._output: List[List[tuple]] = [[]]
+        self._built = True
+        self.keyword_count = 0
+
+    def add(self, keyword: str, category: str, weight: float = 1.0):
+        keyword = " ".join(keyword.lower().split())
+        if not keyword:
+            return
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._keywords.append([])
+            state = next_state
+        self._keywords[state].append((category, weight, len(keyword)))
+        self.keyword_count += 1
+        self._built = False
+
+    def build(self):
+        """Compute failure links and outputs; called automatically before matching"""
+        self._output = [list(keywords) for keywords in self._keywords]
+        queue = list(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+        self._built = True
+
+    def scores(self, text: str, scale: float = 1.0, into: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+        if not self._built:
+            self.build()
+        scores = into if into is not None else {}
+        text = " ".join(text.lower().split())
+        goto, fail, output = self._goto, self._fail, self._output
+        
+        last = len(text) - 1
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if not output[state] or (i < last and text[i + 1].isalnum()):
+                continue
+            for category, weight, length in output[state]:
+                start = i - length + 1
+                if start == 0 or not text[start - 1].isalnum():
+                    scores[category] = scores.get(category, 0.0) + weight * scale
+        return scores
+
+
+class CategoryCache:
+    """Bounded LRU memo of description -> category.
+
+    Keys are built by ExpenseCategorizer from the mode (llm/rules) and the
+    normalized description and vendor. If store_path is given, entries are
+    also written to a small SQLite file so several workers share them.
+    Every key carries the categorizer fingerprint, so entries made with
+    different categories or examples are never returned.
+    """
+
+    def __init__(self, max_entries: int = 4096, store_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.store_path = store_path or None
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            category = self._entries.get(key)
+            if category is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return category
+
+        category = self._store_get(key)
+        with self._lock:
+            if category is not None:
+                self._remember_locked(key, category)
+                self.hits += 1
+                self.store_hits += 1
+            else:
+                self.misses += 1
+        return category
+
+    def put(self, key: str, category: str):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._remember_locked(key, category)
+        self._store_put(key, category)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "shared_store": self.store_path,
+            "hits": self.hits,
+            "store_hits": self.store_hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+    def _remember_locked(self, key: str, category: str):
+        self._entries[key] = category
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if not self.store_path:
+            return None
+        conn = getattr(self._local, "conn", None)
+        # A connection inherited through fork must not be used by the child
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.store_path, timeout=1.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS category_cache (key TEXT PRIMARY KEY, category TEXT NOT NULL)"
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _store_get(self, key: str) -> Optional[str]:
+        try:
+            conn = self._connection()
+            if conn is None:
+                return None
+            row = conn.execute("SELECT category FROM category_cache WHERE key = ?", (key,)).fetchone()
+            return row[0] if row else None
+        except sqlite3.Error as e:
+            logger.warning(f"Category cache store read failed: {e}")
+            return None
+
+    def _store_put(self, key: str, category: str):
+        try:
+            conn = self._connection()
+            if conn is None:
+                return
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO category_cache (key, category) VALUES (?, ?)",
+                    (key, category)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Category cache store write failed: {e}")
+
+
 class ExpenseCategorizer:
     CATEGORIES = [
         "Housing & Shared Living",
@@ -96,58 +283,201 @@ class ExpenseCategorizer:
             "general shared purchases"
         ]
     }
-    def __init__(self, use_llm: bool = False):
+    # Matched as whole words, so plural and derived forms are listed too
+    KEYWORDS = {
+        "Housing & Shared Living": ["rent", "lease", "electric", "electricity", "water", "gas", "internet",
+                                    "wifi", "utility", "utilities"],
+        "Food & Groceries": ["grocery", "groceries", "restaurant", "restaurants", "cafe", "food", "meal", "meals",
+                             "dinner", "lunch", "coffee"],
+        "Travel & Trips": ["uber", "lyft", "taxi", "flight", "flights", "hotel", "train", "bus", "travel"],
+        "Events & Entertainment": ["movie", "movies", "netflix", "concert", "concerts", "game", "games", "bowling",
+                                   "event", "events", "ticket", "tickets"],
+        "Household & Essentials": ["cleaning", "toilet", "supply", "supplies", "furniture", "appliance",
+                                   "appliances"],
+        "Work / Education": ["office", "study", "course", "courses", "book", "books", "software", "project"],
+        "Health & Fitness": ["gym", "sports", "fitness", "medical", "health"],
+        "Gifts & Miscellaneous": ["gift", "gifts", "donation", "charity"]
+    }
+
+    # A hit in the vendor field counts more than one in the free-text description
+    VENDOR_WEIGHT = 2.0
+
+    MODEL_NAME = 'all-MiniLM-L6-v2'
+
+    def __init__(self, use_llm: bool = False, cache_dir: Optional[str] = None):
         self.use_llm = use_llm
         self.model = None
         self.category_embeddings = {}
+        # All example embeddings, L2-normalized and grouped by category (rows)
+        self.category_matrix = None
+        self.category_index = None
+        # (matrix, category segment starts, category names), replaced as one
+        # tuple so a concurrent _best_categories never mixes old and new parts
+        self._scoring = None
+        
+        # Category embeddings are cached on disk, keyed by model and example texts
+        self.cache_dir = cache_dir or os.getenv("EMBEDDING_CACHE_DIR") or os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), ".cache"
+        )
+        self._init_lock = threading.Lock()
+        self._loader = None
+        
+        # Keyword matcher is built once; extra user/vendor keywords come from
+        # CATEGORIZER_KEYWORDS_FILE: {"keywords": {category: [...]}, "vendors": {category: [...]}}
+        self.keyword_config = {"keywords": {c: list(k) for c, k in self.KEYWORDS.items()}, "vendors": {}}
+        self._load_keyword_file(os.getenv("CATEGORIZER_KEYWORDS_FILE"))
+        self._build_matcher()
+        
+        # Examples the embeddings are built from; change them with add_examples()
+        self.category_examples = {c: list(e) for c, e in self.CATEGORY_EXAMPLES.items()}
+        
+        # Memo of recent results. Keys carry the fingerprint, which only the
+        # mutators (add_keywords, add_examples) recompute, bumping config_version
+        self.cache = CategoryCache(
+            max_entries=int(os.getenv("CATEGORY_CACHE_SIZE", "4096")),
+            store_path=os.getenv("CATEGORY_CACHE_DB")
+        )
+        self.config_version = 0
+        self._fingerprint = self._compute_fingerprint()
         
         # Don't load ML dependencies at init, load them when needed
         if use_llm:
             logger.info("ML-based categorization requested. Will load dependencies when needed.")
 
+    @property
+    def model_ready(self) -> bool:
+        return self.model is not None
+
+    def start_background_load(self):
+        """Load the model in a background thread; rule-based answers meanwhile"""
+        if not self.use_llm or self.model_ready or self._loader is not None:
+            return
+        self._loader = threading.Thread(
+            target=self._initialize_model, name="categorizer-load", daemon=True
+        )
+        self._loader.start()
+
+    def load(self) -> bool:
+        """Load the model now, e.g. in a parent process before forking workers"""
+        return self.use_llm and self._initialize_model()
+
+    def _model_available(self) -> bool:
+        """Whether embedding scoring can be used right now (loads on demand)"""
+        if self.model_ready:
+            return True
+        if self._loader is not None and self._loader.is_alive():
+            # Still loading in the background, don't block the request
+            return False
+        return self._initialize_model()
+
     def _initialize_model(self):
         if not _load_ml_dependencies():
             self.use_llm = False
             return False
-            
+        
+        with self._init_lock:
+            if self.model_ready:
+                return True
+            try:
+                model = SentenceTransformer(self.MODEL_NAME)
+                logger.info("Loaded sentence transformer model")
+
+                self._build_category_matrix(model)
+                # Published last: model_ready implies the matrix is in place
+                self.model = model
+                return True
+                    
+            except Exception as e:
+                logger.error(f"Failed to initialize model: {e}")
+                self.use_llm = False
+                return False
+
+    def _build_category_matrix(self, model):
+        categories = list(self.category_examples)
+        example_texts = []
+        category_index = []
+        for i, category in enumerate(categories):
+            for example in self.category_examples[category]:
+                example_texts.append(f"{category}: {example}")
+                category_index.append(i)
+        
+        matrix = self._load_or_encode_examples(model, example_texts)
+        self._set_category_matrix(categories, matrix, category_index)
+
+    def _embedding_cache_path(self, example_texts: List[str]) -> str:
+        key = json.dumps([self.MODEL_NAME, example_texts]).encode("utf-8")
+        digest = hashlib.sha256(key).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"category_embeddings_{digest}.npy")
+
+    def _load_or_encode_examples(self, model, example_texts: List[str]) -> np.ndarray:
+        """Normalized example embeddings, memory-mapped from disk when cached"""
+        path = self._embedding_cache_path(example_texts)
         try:
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
-            logger.info("Loaded sentence transformer model")
-
-            self.category_embeddings = {}
-            for category, examples in self.CATEGORY_EXAMPLES.items():
-                example_texts = [f"{category}: {example}" for example in examples]
-                embeddings = self.model.encode(example_texts)
-                self.category_embeddings[category] = embeddings
-            return True
-                
-        except Exception as e:
-            logger.error(f"Failed to initialize model: {e}")
-            self.use_llm = False
-            return False
+            matrix = np.load(path, mmap_mode='r')
+            if matrix.shape[0] == len(example_texts):
+                logger.info(f"Loaded category embeddings from {path}")
+                return matrix
+        except (OSError, ValueError):
+            pass
+        
+        matrix = self._normalize(np.asarray(model.encode(example_texts), dtype=np.float32))
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, matrix)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not cache category embeddings: {e}")
+        return matrix
+
+    def _set_category_matrix(self, categories: List[str], matrix: np.ndarray, category_index: List[int]):
+        """Install L2-normalized example embeddings whose rows are grouped by category"""
+        category_index = np.asarray(category_index, dtype=np.int64)
+        # Rows are grouped by category, so each category is one contiguous segment
+        starts = np.searchsorted(category_index, np.arange(len(categories)))
+        ends = list(starts[1:]) + [len(category_index)]
+        self._scoring = (matrix, starts, list(categories))
+        self.category_matrix = matrix
+        self.category_index = category_index
+        self.category_embeddings = {
+            category: matrix[start:end]
+            for category, start, end in zip(categories, starts, ends)
+        }
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def _best_categories(self, query_embeddings: np.ndarray):
+        """Cosine similarity of N queries against every example in one matmul,
+        then a per-category (segmented) max. Returns (category names, scores)."""
+        matrix, starts, names = self._scoring
+        queries = self._normalize(np.asarray(query_embeddings, dtype=np.float32))
+        similarities = queries @ matrix.T
+        per_category = np.maximum.reduceat(similarities, starts, axis=1)
+        best = per_category.argmax(axis=1)
+        scores = per_category[np.arange(len(best)), best]
+        return [names[i] for i in best], scores
 
     def categorize_with_llm(self, description: str) -> str:
         if not self.use_llm or not description:
             return self.categorize_rule_based(description)
         
         # Initialize model on first use
-        if self.model is None:
-            if not self._initialize_model():
-                return self.categorize_rule_based(description)
+        if not self._model_available():
+            return self.categorize_rule_based(description)
         
+        return self._categorize_with_model(description)
+
+    def _categorize_with_model(self, description: str) -> str:
+        """Embedding answer for a description; the model must be loaded"""
         try:
             query_embedding = self.model.encode([description])
             
-            best_category = None
-            best_similarity = -1
-            
-            for category, embeddings in self.category_embeddings.items():
-                similarities = cosine_similarity(query_embedding, embeddings)
-                max_similarity = np.max(similarities)
-                
-                if max_similarity > best_similarity:
-                    best_similarity = max_similarity
-                    best_category = category
+            categories, scores = self._best_categories(query_embedding)
+            best_category, best_similarity = categories[0], scores[0]
 
             if best_similarity > 0.3: 
                 return best_category
@@ -158,63 +488,156 @@ class ExpenseCategorizer:
             logger.error(f"LLM categorization failed: {e}")
             return self.categorize_rule_based(description)
     
+    def _load_keyword_file(self, path: Optional[str]):
+        if not path:
+            return
+        try:
+            with open(path) as f:
+                config = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load keyword file {path}: {e}")
+            return
+        for section in ("keywords", "vendors"):
+            for category, keywords in config.get(section, {}).items():
+                if category not in self.CATEGORIES:
+                    logger.warning(f"Ignoring keywords for unknown category '{category}'")
+                    continue
+                self.keyword_config[section].setdefault(category, []).extend(keywords)
+
+    def add_keywords(self, category: str, keywords: List[str], vendor: bool = False):
+        """Register extra keywords (or vendor names) for a category at runtime"""
+        if category not in self.CATEGORIES:
+            raise ValueError(f"Unknown category: {category}")
+        section = "vendors" if vendor else "keywords"
+        self.keyword_config[section].setdefault(category, []).extend(keywords)
+        self._build_matcher()
+        # Embeddings do not depend on keywords, only memoized results do
+        self._config_changed()
+
+    def add_examples(self, category: str, examples: List[str]):
+        """Add example descriptions for a category and re-embed them with the loaded model"""
+        if category not in self.CATEGORIES:
+            raise ValueError(f"Unknown category: {category}")
+        with self._init_lock:
+            self.category_examples.setdefault(category, []).extend(examples)
+            if self.model_ready:
+                self._build_category_matrix(self.model)
+        self._config_changed()
+
+    def _config_changed(self):
+        self.config_version += 1
+        self._fingerprint = self._compute_fingerprint()
+        self.cache.clear()
+        logger.info(f"Categorizer config changed (version {self.config_version}), cleared categorization cache")
+
+    def _build_matcher(self):
+        matcher = KeywordMatcher()
+        for category, keywords in self.keyword_config["keywords"].items():
+            for keyword in keywords:
+                matcher.add(keyword, category)
+        for category, vendors in self.keyword_config["vendors"].items():
+            for vendor in vendors:
+                matcher.add(vendor, category, self.VENDOR_WEIGHT)
+        matcher.build()
+        self.matcher = matcher
+
+    def keyword_scores(self, description: str, vendor: str = None) -> Dict[str, float]:
+        """Per-category keyword score for a description and optional vendor"""
+        scores = self.matcher.scores(description or "")
+        if vendor:
+            self.matcher.scores(vendor, scale=self.VENDOR_WEIGHT, into=scores)
+        return scores
+
     def categorize_rule_based(self, description: str, vendor: str = None) -> str:
-        if not description:
+        if not description and not vendor:
             return "Gifts & Miscellaneous"
-            
-        description_lower = description.lower()
-        
-        # Keyword mapping (simplified version)
-        keyword_mapping = {
-            "Housing & Shared Living": ["rent", "lease", "electric", "water", "gas", "internet", "wifi", "utility"],
-            "Food & Groceries": ["grocery", "restaurant", "cafe", "food", "meal", "dinner", "lunch", "coffee"],
-            "Travel & Trips": ["uber", "lyft", "taxi", "flight", "hotel", "train", "bus", "travel"],
-            "Events & Entertainment": ["movie", "netflix", "concert", "game", "bowling", "event", "ticket"],
-            "Household & Essentials": ["cleaning", "toilet", "supply", "furniture", "appliance"],
-            "Work / Education": ["office", "study", "course", "book", "software", "project"],
-            "Health & Fitness": ["gym", "sports", "fitness", "medical", "health"],
-            "Gifts & Miscellaneous": ["gift", "donation", "charity"]
-        }
         
-        for category, keywords in keyword_mapping.items():
-            if any(keyword in description_lower for keyword in keywords):
-                return category
+        scores = self.keyword_scores(description, vendor)
+        if not scores:
+            return "Gifts & Miscellaneous"
         
-        return "Gifts & Miscellaneous"
+        # Highest score wins; ties go to the earlier category, as first-match did before
+        return max(self.CATEGORIES, key=lambda category: scores.get(category, 0.0))
     
+    def _compute_fingerprint(self) -> str:
+        """Content hash of the configuration; keys shared through CATEGORY_CACHE_DB depend on it"""
+        key = json.dumps(
+            [self.MODEL_NAME, self.CATEGORIES, self.category_examples, self.keyword_config],
+            sort_keys=True
+        )
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def _normalize_text(text: Optional[str]) -> str:
+        # Matching is case- and whitespace-insensitive, so this loses nothing
+        return " ".join((text or "").lower().split())
+
+    def _use_model(self, use_llm: bool) -> bool:
+        """Whether embedding scoring runs for this call; may load the model first"""
+        return bool(use_llm and self.use_llm and self._model_available())
+
+    def _cache_key(self, use_model: bool, description: str, vendor: str) -> str:
+        # Key on the path that actually runs: until the model is ready the LLM path answers with rules
+        mode = "llm" if use_model else "rules"
+        return f"{self._fingerprint}|{mode}|{description}|{vendor}"
+
     def categorize(self, description: str, vendor: str = None, use_llm: bool = None) -> str:
         use_llm = use_llm if use_llm is not None else self.use_llm
+        description = self._normalize_text(description)
+        vendor = self._normalize_text(vendor)
         
-        if use_llm:
-            return self.categorize_with_llm(description)
+        # Decided (and the model loaded) before the key is built, so key and answer agree
+        use_model = self._use_model(use_llm)
+        key = self._cache_key(use_model, description, vendor)
+        category = self.cache.get(key)
+        if category is not None:
+            return category
+        
+        if use_model and description:
+            category = self._categorize_with_model(description)
+        elif use_llm:
+            # The embedding path has never used the vendor
+            category = self.categorize_rule_based(description)
         else:
-            return self.categorize_rule_based(description, vendor)
+            category = self.categorize_rule_based(description, vendor)
+        
+        self.cache.put(key, category)
+        return category
     
     def batch_categorize(self, descriptions: List[str], use_llm: bool = None) -> List[str]:
         use_llm = use_llm if use_llm is not None else self.use_llm
+        descriptions = [self._normalize_text(desc) for desc in descriptions]
         
-        if use_llm and self.use_llm:
-            # Initialize model on first use
-            if self.model is None:
-                if not self._initialize_model():
-                    return [self.categorize_rule_based(desc) for desc in descriptions]
-            
+        use_model = self._use_model(use_llm)
+        keys = [self._cache_key(use_model, desc, "") for desc in descriptions]
+        results = {}
+        missing = {}
+        for key, desc in zip(keys, descriptions):
+            if key in results or key in missing:
+                continue
+            category = self.cache.get(key)
+            if category is not None:
+                results[key] = category
+            else:
+                missing[key] = desc
+        
+        # Only distinct, uncached descriptions reach the model
+        if missing:
+            computed = self._batch_categorize_uncached(list(missing.values()), use_model)
+            for key, category in zip(missing, computed):
+                results[key] = category
+                self.cache.put(key, category)
+        
+        return [results[key] for key in keys]
+    
+    def _batch_categorize_uncached(self, descriptions: List[str], use_model: bool) -> List[str]:
+        if use_model:
             try:
                 embeddings = self.model.encode(descriptions)
+                best_categories, scores = self._best_categories(embeddings)
                 categories = []
                 
-                for i, embedding in enumerate(embeddings):
-                    best_category = None
-                    best_similarity = -1
-                    
-                    for category, cat_embeddings in self.category_embeddings.items():
-                        similarities = cosine_similarity([embedding], cat_embeddings)
-                        max_similarity = np.max(similarities)
-                        
-                        if max_similarity > best_similarity:
-                            best_similarity = max_similarity
-                            best_category = category
-                    
+                for i, (best_category, best_similarity) in enumerate(zip(best_categories, scores)):
                     if best_similarity > 0.3:
                         categories.append(best_category)
                     else:
@@ -0,0 +1,94 @@
+import itertools
+import os
+import random
+import time
+from typing import Optional
+
+# Crockford base32: no I, L, O or U, and digits sort before letters as in ASCII
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_DECODE = {char: value for value, char in enumerate(_ALPHABET)}
+_PAIRS = [a + b for a in _ALPHABET for b in _ALPHABET]
+
+# 48-bit millisecond timestamp | 16-bit worker id | 32-bit per-process counter
+_TIMESTAMP_BITS = 48
+_WORKER_BITS = 16
+_COUNTER_BITS = 32
+_ID_BITS = _TIMESTAMP_BITS + _WORKER_BITS + _COUNTER_BITS
+
+# 96 bits fill 20 base32 characters (4 low padding bits); fixed width
+# keeps string order equal to numeric order
+ENCODED_LENGTH = 20
+_PAIR_SHIFTS = range(ENCODED_LENGTH * 5 - 10, -1, -10)
+
+
+class IdGenerator:
+    """Time-ordered ids, unique across workers and monotonic within a process.
+
+    Each id packs milliseconds since the epoch, a worker id and a value
+    from a process-wide itertools.count. next() on the counter is atomic
+    under the GIL, so no lock is needed: two calls always get different
+    counter values. The clock is the wall time at start plus
+    time.monotonic() elapsed, so it never steps backwards either. An id
+    made after another one finished therefore sorts after it, and string
+    order is creation order.
+    """
+
+    def __init__(self, worker_id: Optional[int] = None):
+        self.reset(worker_id)
+
+    def reset(self, worker_id: Optional[int] = None):
+        """(Re)initialize state, e.g. in a freshly forked worker"""
+        if worker_id is None:
+            env_worker = os.getenv("WORKER_ID")
+            worker_id = int(env_worker) if env_worker else random.getrandbits(_WORKER_BITS)
+        if not 0 <= worker_id < 1 << _WORKER_BITS:
+            raise ValueError(f"worker_id must be between 0 and {(1 << _WORKER_BITS) - 1}")
+        self.worker_id = worker_id
+        self._counter = itertools.count()
+        self._wall_anchor_ms = time.time() * 1000
+        self._monotonic_anchor = time.monotonic()
+
+    def _now_ms(self) -> int:
+        return int(self._wall_anchor_ms + (time.monotonic() - self._monotonic_anchor) * 1000)
+
+    def next_int(self) -> int:
+        timestamp = self._now_ms() & ((1 << _TIMESTAMP_BITS) - 1)
+        counter = next(self._counter) & ((1 << _COUNTER_BITS) - 1)
+        return (timestamp << (_WORKER_BITS + _COUNTER_BITS)) | (self.worker_id << _COUNTER_BITS) | counter
+
+    def new_id(self, prefix: str = "") -> str:
+        return prefix + encode(self.next_int())
+
+
+def encode(value: int) -> str:
+    # Two characters per 10-bit chunk via a lookup table; base64.b32encode is pure Python and slower
+    value <<= ENCODED_LENGTH * 5 - _ID_BITS
+    return "".join([_PAIRS[(value >> shift) & 1023] for shift in _PAIR_SHIFTS])
+
+
+def decode(encoded: str) -> int:
+    value = 0
+    for char in encoded.upper():
+        value = (value << 5) | _DECODE[char]
+    return value >> (ENCODED_LENGTH * 5 - _ID_BITS)
+
+
+def timestamp_ms(id_value: str) -> int:
+    """Creation time (ms since the epoch) of an id, ignoring any prefix"""
+    return decode(id_value[-ENCODED_LENGTH:]) >> (_WORKER_BITS + _COUNTER_BITS)
+
+
+generator = IdGenerator()
+
+# A forked worker must not reuse its parent's worker id; a launcher that
+# knows the worker's index should still call generator.reset(index)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=lambda: generator.reset(random.getrandbits(_WORKER_BITS)))
+
+
+def new_group_id() -> str:
+    return generator.new_id("group_")
+
+
+def new_expense_id() -> str:
+    return generator.new_id("exp_")
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ExecutorBusyError(Exception):
+    """Raised when the inference queue is full (maps to HTTP 429)"""
+
+
+class ExecutorUnavailableError(Exception):
+    """Raised when the executor is not accepting work (maps to HTTP 503)"""
+
+
+class InferenceExecutor:
+    """Runs blocking model inference away from the asyncio event loop.
+
+    mode="thread" shares the process-wide models across worker threads;
+    mode="process" runs each worker in its own process and calls
+    initializer there so models are preloaded once per worker. At most
+    max_workers jobs run and max_queue more may wait; beyond that callers
+    get ExecutorBusyError instead of piling up behind a slow scan.
+    """
+
+    def __init__(
+        self,
+        mode: str = "thread",
+        max_workers: int = 1,
+        max_queue: int = 8,
+        timeout: Optional[float] = 120.0,
+        initializer: Optional[Callable[[], Any]] = None,
+    ):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown executor mode: {mode}")
+
+        self.mode = mode
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.timeout = timeout or None
+        self.initializer = initializer
+
+        self._pool: Optional[Executor] = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._probe = None
+        self._probe_result = None
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    def start(self):
+        with self._lock:
+            if self._pool is not None:
+                return
+            if self.mode == "process":
+                # spawn: never fork a process that already runs the event loop
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=self.initializer,
+                )
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="inference",
+                    initializer=self.initializer,
+                )
+            self._closed = False
+        logger.info(
+            f"Inference executor started: {self.mode} x{self.max_workers}, "
+            f"queue depth {self.max_queue}"
+        )
+
+    def shutdown(self, wait: bool = False):
+        with self._lock:
+            pool, self._pool = self._pool, None
+            self._closed = True
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """Run fn(*args) on the pool, enforcing queue depth and timeout"""
+        if self._pool is None and not self._closed:
+            self.start()
+
+        with self._lock:
+            if self._pool is None:
+                raise ExecutorUnavailableError("Inference executor is shut down")
+            if self._pending >= self.capacity:
+                self.rejected += 1
+                raise ExecutorBusyError(
+                    f"Inference queue full ({self._pending}/{self.capacity})"
+                )
+            self._pending += 1
+            try:
+                future = self._pool.submit(fn, *args)
+            except RuntimeError as e:
+                self._pending -= 1
+                raise ExecutorUnavailableError(str(e))
+
+        # Capacity is released when the job really finishes, not when the caller gives up
+        future.add_done_callback(self._release)
+
+        timeout = timeout if timeout is not None else self.timeout
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise
+
+    async def probe(self, fn: Callable, timeout: float = 2.0) -> Any:
+        """Run fn() on a worker outside the queue limits, to read worker-side state.
+
+        At most one probe is in flight and concurrent callers share it, so
+        a stuck pool cannot pile them up. If it does not finish in time
+        (workers starting, warming up or all busy) the last probe's result
+        is returned, or asyncio.TimeoutError raised if there is none.
+        """
+        if self._pool is None and not self._closed:
+            self.start()
+
+        with self._lock:
+            if self._pool is None:
+                raise ExecutorUnavailableError("Inference executor is shut down")
+            if self._probe is None or self._probe.done():
+                try:
+                    self._probe = self._pool.submit(fn)
+                except RuntimeError as e:
+                    raise ExecutorUnavailableError(str(e))
+            future = self._probe
+
+        try:
+            # shield: a caller timing out must not cancel the shared probe
+            self._probe_result = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+        except asyncio.TimeoutError:
+            if self._probe_result is None:
+                raise
+        return self._probe_result
+
+    def stats(self) -> Dict:
+        return {
+            "mode": self.mode,
+            "running": self._pool is not None,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "timeout_seconds": self.timeout,
+        }
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+            if not future.cancelled():
+                self.completed += 1
@@ -1,16 +1,28 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict
 from datetime import datetime
+import asyncio
 import logging
 import json
 import os
+import threading
 import uvicorn
 
-from receipt_scanner import ReceiptScanner
+from receipt_scanner import (
+    ReceiptScanner, donut_registry, warm_up_worker, worker_status, PREPROCESS_PROFILES
+)
+from inference_executor import InferenceExecutor, ExecutorBusyError, ExecutorUnavailableError
+from scan_jobs import ScanJobManager, JobQueueFullError
 from expense_categorizer import ExpenseCategorizer  
-from settlement_optimizer import SettlementOptimizer
+from settlement_optimizer import SettlementOptimizer, BalanceLedger, SETTLEMENT_ENGINES, from_cents
+from storage import create_repository, settlement_view
+from ids import new_group_id, new_expense_id
+from bulk_import import BulkImportError, limit_body, read_body, read_csv_rows, parse_json_rows, validate_rows
+from uploads import UploadLimitMiddleware, FORM_OVERHEAD_BYTES, read_upload
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -21,6 +33,17 @@ app = FastAPI(
     version="2.0.0"
 )
 
+# Largest receipt image accepted. Uploads are read in chunks and cut off
+# past this, and decoding is capped separately by MAX_IMAGE_PIXELS
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+
+# Added before CORS so that a 413 still carries CORS headers
+app.add_middleware(
+    UploadLimitMiddleware,
+    paths=["/scan-receipt", "/scan-jobs"],
+    max_bytes=MAX_UPLOAD_BYTES + FORM_OVERHEAD_BYTES
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -29,14 +52,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory storage
-groups_db = {}
-expenses_db = {}
-users_db = {}
+# Groups, users, expenses and per-group net balances; SQLite unless
+# STORAGE_BACKEND=memory. Balances are updated in the same write as expenses.
+repository = create_repository()
+
+# Time the exact settlement engine may spend before falling back to greedy
+SETTLEMENT_TIME_BUDGET_MS = float(os.getenv("SETTLEMENT_TIME_BUDGET_MS", "200"))
 
-# Initialize AI categorizer (start with rule-based for faster startup)
-expense_categorizer = ExpenseCategorizer(use_llm=False)
-logger.info("Expense categorizer initialized (rule-based mode)")
+# Rule-based categorizer by default. With CATEGORIZER_USE_LLM=true the
+# model loads in the background at startup and rule-based categorization
+# answers until it is ready. The on-disk embedding cache only skips encoding
+# the ~40 category examples; importing torch and loading the
+# SentenceTransformer remain the cold-start cost, so AI mode stays opt-in
+# until that load has been measured on production hardware
+CATEGORIZER_USE_LLM = os.getenv("CATEGORIZER_USE_LLM", "false").lower() in ("1", "true", "yes")
+expense_categorizer = ExpenseCategorizer(use_llm=CATEGORIZER_USE_LLM)
+logger.info(f"Expense categorizer initialized ({'AI' if CATEGORIZER_USE_LLM else 'rule-based'} mode)")
+
+# Largest number of rows, and body size, one POST /expenses/bulk may carry
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "50000"))
+BULK_MAX_BYTES = int(os.getenv("BULK_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Load the receipt model at startup instead of on the first scan
+WARM_UP_MODELS = os.getenv("WARM_UP_MODELS", "true").lower() in ("1", "true", "yes")
+
+# Receipt OCR runs here so a scan never blocks the event loop
+INFERENCE_MODE = os.getenv("INFERENCE_EXECUTOR", "thread")
+inference_executor = InferenceExecutor(
+    mode=INFERENCE_MODE,
+    # Threads share one model, so several can feed the Donut micro-batcher
+    max_workers=int(os.getenv("INFERENCE_WORKERS", "4" if INFERENCE_MODE == "thread" else "1")),
+    max_queue=int(os.getenv("INFERENCE_QUEUE_DEPTH", "8")),
+    timeout=float(os.getenv("SCAN_TIMEOUT_SECONDS", "120")),
+    initializer=warm_up_worker if INFERENCE_MODE == "process" and WARM_UP_MODELS else None,
+)
 
 # Data models
 class User(BaseModel):
@@ -72,23 +121,61 @@ async def health_check():
         data={
             "version": "2.0.0",
             "workflow": "Scan → Categorize → Optimize",
-            "endpoints": 8,
-            "ai_enabled": expense_categorizer.use_llm
+            "endpoints": 12,
+            "ai_enabled": expense_categorizer.use_llm,
+            "ai_model_ready": expense_categorizer.model_ready
+        }
+    )
+
+# Longest /ready waits for an inference worker process to report its state
+READY_PROBE_SECONDS = float(os.getenv("READY_PROBE_SECONDS", "2"))
+
+async def _scanner_status() -> Dict:
+    """worker_status() of the process that runs scans: this one, or an inference worker"""
+    if INFERENCE_MODE != "process":
+        return worker_status()
+    try:
+        return await inference_executor.probe(worker_status, timeout=READY_PROBE_SECONDS)
+    except asyncio.TimeoutError:
+        # No worker has answered yet: still spawning or warming up
+        return {"models": {"donut": {"name": donut_registry.name, "status": "starting", "resident": False}}}
+    except Exception as e:
+        return {"models": {"donut": {"name": donut_registry.name, "status": "failed", "resident": False, "error": str(e)}}}
+
+@app.get("/ready", response_model=ApiResponse)
+async def readiness_check(response: Response):
+    """Readiness probe - reports whether the receipt model can serve scans"""
+    scanner_status = await _scanner_status()
+    model_status = scanner_status["models"]["donut"]
+    # An idle-unloaded model is still considered ready: it reloads on demand,
+    # as does a model that is never warmed up and loads on the first scan
+    ready = (
+        model_status["resident"]
+        or model_status["status"] == "unloaded"
+        or (model_status["status"] == "not_loaded" and not WARM_UP_MODELS)
+    )
+    if not ready:
+        response.status_code = 503
+    
+    return ApiResponse(
+        success=ready,
+        message="Receipt model ready" if ready else f"Receipt model {model_status['status']}",
+        data={
+            **scanner_status,
+            "category_cache": expense_categorizer.cache.stats(),
+            "inference_executor": inference_executor.stats(),
+            "scan_jobs": scan_jobs.stats(),
+            "storage": repository.stats()
         }
     )
 
 @app.post("/groups/create", response_model=ApiResponse)
-async def create_group(group: GroupCreate):
+def create_group(group: GroupCreate):
     """Create new expense-sharing group"""
     try:
-        group_id = f"group_{len(groups_db) + 1}"
+        group_id = new_group_id()
         
-        # Store members in users database
-        for member in group.members:
-            if member.id not in users_db:
-                users_db[member.id] = member.dict()
-        
-        # Create group record
+        # Create group record; new members are stored in the users table with it
         group_record = {
             "id": group_id,
             "name": group.name,
@@ -98,7 +185,7 @@ async def create_group(group: GroupCreate):
             "total_amount": 0.0
         }
         
-        groups_db[group_id] = group_record
+        repository.create_group(group_record)
         logger.info(f"Group created: {group_id}")
         
         return ApiResponse(
@@ -112,113 +199,258 @@ async def create_group(group: GroupCreate):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/groups/{group_id}", response_model=ApiResponse)
-async def get_group(group_id: str):
+def get_group(group_id: str):
     """Get group details and members"""
-    if group_id not in groups_db:
+    group = repository.get_group(group_id)
+    if group is None:
         raise HTTPException(status_code=404, detail="Group not found")
     
     return ApiResponse(
         success=True,
         message="Group found",
-        data={"group": groups_db[group_id]}
+        data={"group": group}
     )
 
+async def _read_receipt_upload(file: UploadFile, group_id: str, split_among_user_ids: str):
+    """Validate a receipt upload form and return (image bytes, split user ids)"""
+    if not await run_in_threadpool(repository.has_group, group_id):
+        raise HTTPException(status_code=404, detail="Group not found")
+    
+    try:
+        split_users = json.loads(split_among_user_ids)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid user IDs format")
+    
+    if not file.content_type or not file.content_type.startswith('image/'):
+        raise HTTPException(status_code=400, detail="Please upload a valid image")
+    
+    return await read_upload(file, MAX_UPLOAD_BYTES), split_users
+
+def _check_preprocess_profile(profile: Optional[str]):
+    if profile is not None and profile not in PREPROCESS_PROFILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown preprocess_profile '{profile}', expected one of: {', '.join(PREPROCESS_PROFILES)}"
+        )
+
+async def _scan_receipt_image(image_data: bytes, profile: Optional[str] = None) -> Dict:
+    """Run OCR on the inference executor, mapping backpressure to HTTP errors"""
+    try:
+        return await inference_executor.run(ReceiptScanner.scan_receipt, image_data, profile)
+    except ExecutorBusyError:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many receipts being scanned, please retry shortly",
+            headers={"Retry-After": "5"}
+        )
+    except ExecutorUnavailableError:
+        raise HTTPException(status_code=503, detail="Receipt scanner unavailable")
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Receipt scan timed out")
+
+def _create_receipt_expense(receipt_data: Dict, group_id: str, paid_by_user_id: str,
+                            split_users: List[str]) -> ApiResponse:
+    """Categorize a scanned receipt and store it as an expense"""
+    if not receipt_data.get("total_amount") or receipt_data.get("total_amount") == 0:
+        return ApiResponse(
+            success=False,
+            message="Could not extract amount from receipt. Try a clearer image or add manually.",
+            data={
+                "raw_text": receipt_data.get("raw_text", ""),
+                "vendor": receipt_data.get("vendor", ""),
+                "error": receipt_data.get("error")
+            }
+        )
+    
+    # Step 2: AI categorization
+    logger.info("AI categorizing...")
+    vendor = receipt_data.get("vendor", "Unknown Vendor")
+    description = f"Receipt from {vendor}"
+    
+    try:
+        category = expense_categorizer.categorize(description=description, vendor=vendor)
+    except Exception as e:
+        logger.warning(f"Categorization failed: {e}")
+        category = "Gifts & Miscellaneous"
+    
+    # Step 3: Create expense
+    expense_id = new_expense_id()
+    amount = receipt_data["total_amount"]
+    
+    expense = {
+        "id": expense_id,
+        "description": description,
+        "amount": amount,
+        "paid_by_user_id": paid_by_user_id,
+        "split_among_user_ids": split_users,
+        "group_id": group_id,
+        "category": category,
+        "receipt_data": receipt_data,
+        "created_at": datetime.now().isoformat()
+    }
+    
+    repository.add_expenses([expense])
+    
+    logger.info(f"Expense created: ₹{amount} -> {category}")
+    
+    return ApiResponse(
+        success=True,
+        message=f"Receipt scanned! ₹{amount} auto-categorized as '{category}'",
+        data={
+            "expense": expense,
+            "amount": amount,
+            "vendor": vendor,
+            "category": category
+        }
+    )
+
+# A full inference queue (429) or a timed-out scan (504) says nothing about
+# the receipt, so a scan job retries those with a growing delay before failing
+SCAN_JOB_RETRIES = int(os.getenv("SCAN_JOB_RETRIES", "3"))
+SCAN_JOB_RETRY_DELAY_SECONDS = float(os.getenv("SCAN_JOB_RETRY_DELAY_SECONDS", "5"))
+
+async def _process_scan_job(payload: Dict) -> Dict:
+    """Scan job handler: same pipeline as /scan-receipt, run off the request path"""
+    for attempt in range(SCAN_JOB_RETRIES + 1):
+        try:
+            receipt_data = await _scan_receipt_image(payload["image_data"], payload.get("preprocess_profile"))
+            break
+        except HTTPException as e:
+            if e.status_code not in (429, 504) or attempt == SCAN_JOB_RETRIES:
+                raise
+            delay = SCAN_JOB_RETRY_DELAY_SECONDS * (attempt + 1)
+            logger.info(f"Scan job attempt {attempt + 1} got {e.status_code}, retrying in {delay:.0f}s")
+            await asyncio.sleep(delay)
+    # Categorizing and storing block, so they run on the threadpool
+    response = await run_in_threadpool(
+        _create_receipt_expense,
+        receipt_data,
+        payload["group_id"],
+        payload["paid_by_user_id"],
+        payload["split_users"]
+    )
+    return response.dict()
+
+SCAN_JOB_TTL_SECONDS = float(os.getenv("SCAN_JOB_TTL_SECONDS", "3600"))
+
+scan_jobs = ScanJobManager(
+    _process_scan_job,
+    # One job per inference worker keeps the executor queue from overflowing
+    workers=inference_executor.max_workers,
+    max_queue=int(os.getenv("SCAN_JOB_QUEUE_DEPTH", "100")),
+    # Queued uploads are held in memory by each worker process
+    max_queued_bytes=int(os.getenv("SCAN_JOB_QUEUE_BYTES", str(64 * 1024 * 1024))),
+    ttl_seconds=SCAN_JOB_TTL_SECONDS,
+    # Job state goes to storage so any worker process can answer a poll
+    on_update=lambda job: repository.save_job(job, SCAN_JOB_TTL_SECONDS)
+)
+
+@app.on_event("startup")
+async def start_background_workers():
+    inference_executor.start()
+    await scan_jobs.start()
+    expense_categorizer.start_background_load()
+    # Process workers load their own copy; only warm the in-process model for threads
+    if WARM_UP_MODELS and INFERENCE_MODE == "thread":
+        # Loads in a background thread so lightweight endpoints are served meanwhile
+        threading.Thread(target=warm_up_worker, name="ocr-warmup", daemon=True).start()
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    await scan_jobs.stop()
+    inference_executor.shutdown()
+    repository.close()
+
 @app.post("/scan-receipt", response_model=ApiResponse)
 async def scan_receipt_and_create_expense(
     file: UploadFile = File(...),
     group_id: str = Form(...),
     paid_by_user_id: str = Form(...),
-    split_among_user_ids: str = Form(...)
+    split_among_user_ids: str = Form(...),
+    preprocess_profile: Optional[str] = Form(None)
 ):
     """Main feature: Scan receipt -> Auto-categorize -> Create expense"""
     try:
         # Validate inputs
-        if group_id not in groups_db:
-            raise HTTPException(status_code=404, detail="Group not found")
-        
-        split_users = json.loads(split_among_user_ids)
-        
-        if not file.content_type or not file.content_type.startswith('image/'):
-            raise HTTPException(status_code=400, detail="Please upload a valid image")
+        _check_preprocess_profile(preprocess_profile)
+        image_data, split_users = await _read_receipt_upload(file, group_id, split_among_user_ids)
         
         # Step 1: OCR scan receipt
         logger.info("Scanning receipt...")
-        image_data = await file.read()
-        receipt_data = ReceiptScanner.scan_receipt(image_data)
-        
-        if not receipt_data.get("total_amount") or receipt_data.get("total_amount") == 0:
-            return ApiResponse(
-                success=False,
-                message="Could not extract amount from receipt. Try a clearer image or add manually.",
-                data={
-                    "raw_text": receipt_data.get("raw_text", ""),
-                    "vendor": receipt_data.get("vendor", "")
-                }
-            )
-        
-        # Step 2: AI categorization
-        logger.info("AI categorizing...")
-        vendor = receipt_data.get("vendor", "Unknown Vendor")
-        description = f"Receipt from {vendor}"
-        
-        try:
-            category = expense_categorizer.categorize(description=description, vendor=vendor)
-        except Exception as e:
-            logger.warning(f"Categorization failed: {e}")
-            category = "Gifts & Miscellaneous"
-        
-        # Step 3: Create expense
-        expense_id = f"exp_{len(expenses_db) + 1}"
-        amount = receipt_data["total_amount"]
-        
-        expense = {
-            "id": expense_id,
-            "description": description,
-            "amount": amount,
-            "paid_by_user_id": paid_by_user_id,
-            "split_among_user_ids": split_users,
-            "group_id": group_id,
-            "category": category,
-            "receipt_data": receipt_data,
-            "created_at": datetime.now().isoformat()
-        }
-        
-        expenses_db[expense_id] = expense
-        
-        # Update group stats
-        groups_db[group_id]["total_expenses"] += 1
-        groups_db[group_id]["total_amount"] += amount
-        
-        logger.info(f"Expense created: ₹{amount} -> {category}")
+        receipt_data = await _scan_receipt_image(image_data, preprocess_profile)
         
-        return ApiResponse(
-            success=True,
-            message=f"Receipt scanned! ₹{amount} auto-categorized as '{category}'",
-            data={
-                "expense": expense,
-                "amount": amount,
-                "vendor": vendor,
-                "category": category
-            }
+        return await run_in_threadpool(
+            _create_receipt_expense, receipt_data, group_id, paid_by_user_id, split_users
         )
         
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=400, detail="Invalid user IDs format")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Receipt processing failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/scan-jobs", response_model=ApiResponse, status_code=202)
+async def create_scan_job(
+    file: UploadFile = File(...),
+    group_id: str = Form(...),
+    paid_by_user_id: str = Form(...),
+    split_among_user_ids: str = Form(...),
+    preprocess_profile: Optional[str] = Form(None)
+):
+    """Queue a receipt scan and return a job id to poll"""
+    _check_preprocess_profile(preprocess_profile)
+    image_data, split_users = await _read_receipt_upload(file, group_id, split_among_user_ids)
+    
+    try:
+        job = await scan_jobs.submit({
+            "image_data": image_data,
+            "group_id": group_id,
+            "paid_by_user_id": paid_by_user_id,
+            "split_users": split_users,
+            "preprocess_profile": preprocess_profile
+        }, size=len(image_data))
+    except JobQueueFullError:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many scan jobs queued, please retry shortly",
+            headers={"Retry-After": "10"}
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    return ApiResponse(
+        success=True,
+        message="Receipt queued for scanning",
+        data={"job": job, "status_url": f"/scan-jobs/{job['id']}"}
+    )
+
+@app.get("/scan-jobs/{job_id}", response_model=ApiResponse)
+async def get_scan_job(job_id: str):
+    """Get scan job status, and the created expense once finished"""
+    job = scan_jobs.get(job_id)
+    if job is None:
+        # Submitted to another worker process
+        job = await run_in_threadpool(repository.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Scan job not found or expired")
+    
+    return ApiResponse(
+        success=job["status"] != "failed",
+        message=f"Scan job {job['status']}",
+        data={"job": job}
+    )
+
 @app.post("/expenses/manual", response_model=ApiResponse)
-async def create_manual_expense(expense: ExpenseCreate):
+def create_manual_expense(expense: ExpenseCreate):
     """Create manual expense (backup method)"""
     try:
-        if expense.group_id not in groups_db:
+        if not repository.has_group(expense.group_id):
             raise HTTPException(status_code=404, detail="Group not found")
         
         # Auto-categorize
         category = expense.category or expense_categorizer.categorize(expense.description)
         
-        expense_id = f"exp_{len(expenses_db) + 1}"
+        expense_id = new_expense_id()
         expense_dict = {
             "id": expense_id,
             **expense.dict(),
@@ -226,11 +458,7 @@ async def create_manual_expense(expense: ExpenseCreate):
             "created_at": datetime.now().isoformat()
         }
         
-        expenses_db[expense_id] = expense_dict
-        
-        # Update group stats
-        groups_db[expense.group_id]["total_expenses"] += 1
-        groups_db[expense.group_id]["total_amount"] += expense.amount
+        repository.add_expenses([expense_dict])
         
         return ApiResponse(
             success=True,
@@ -241,75 +469,244 @@ async def create_manual_expense(expense: ExpenseCreate):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _store_bulk_expenses(expenses: List[Dict]) -> List[Dict]:
+    """Categorize, assign ids and store a validated batch; returns the auto-categorized rows"""
+    # One categorizer call for every row without a category
+    uncategorized = [e for e in expenses if not e["category"]]
+    if uncategorized:
+        categories = expense_categorizer.batch_categorize([e["description"] for e in uncategorized])
+        for expense, category in zip(uncategorized, categories):
+            expense["category"] = category
+    
+    created_at = datetime.now().isoformat()
+    # Ids are time-ordered, so the batch keeps its upload order
+    for expense in expenses:
+        expense["id"] = new_expense_id()
+        expense["created_at"] = created_at
+    
+    # One transaction for the whole batch
+    repository.add_expenses(expenses)
+    return uncategorized
+
+@app.post("/expenses/bulk", response_model=ApiResponse)
+async def create_bulk_expenses(request: Request, group_id: Optional[str] = None):
+    """Import many expenses at once from a JSON array or a CSV body.
+
+    Rows without a group_id use the group_id query parameter. The set is
+    validated as a whole and nothing is stored if any row is invalid.
+    """
+    content_type = request.headers.get("content-type", "")
+    body = limit_body(request.stream(), BULK_MAX_BYTES)
+    try:
+        if "csv" in content_type:
+            rows = await read_csv_rows(body, BULK_MAX_ROWS)
+        else:
+            # Parsing up to BULK_MAX_BYTES of JSON would stall the event loop
+            rows = await run_in_threadpool(parse_json_rows, await read_body(body, BULK_MAX_BYTES), BULK_MAX_ROWS)
+    except BulkImportError as e:
+        raise HTTPException(status_code=413 if e.too_large else 400, detail=str(e))
+    
+    # Only well-formed ids are looked up; validate_rows reports the others per row
+    referenced = {
+        row["group_id"] for row in rows
+        if isinstance(row, dict) and isinstance(row.get("group_id"), str) and row["group_id"]
+    }
+    if group_id:
+        referenced.add(group_id)
+    known_groups = await run_in_threadpool(repository.existing_groups, referenced)
+    
+    expenses, errors = await run_in_threadpool(validate_rows, rows, known_groups, group_id)
+    if errors:
+        raise HTTPException(
+            status_code=400,
+            detail={"message": "Validation failed, no expenses were added", "errors": errors}
+        )
+    if not expenses:
+        raise HTTPException(status_code=400, detail="No expenses in upload")
+    
+    try:
+        # Categorizing (MiniLM over up to BULK_MAX_ROWS rows) and storing block
+        uncategorized = await run_in_threadpool(_store_bulk_expenses, expenses)
+    except Exception as e:
+        logger.error(f"Bulk import failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    category_breakdown: Dict[str, float] = {}
+    for expense in expenses:
+        category_breakdown[expense["category"]] = category_breakdown.get(expense["category"], 0) + expense["amount"]
+    
+    logger.info(f"Bulk import: {len(expenses)} expenses, {len(uncategorized)} auto-categorized")
+    
+    return ApiResponse(
+        success=True,
+        message=f"Imported {len(expenses)} expenses",
+        data={
+            "count": len(expenses),
+            "auto_categorized": len(uncategorized),
+            "first_expense_id": expenses[0]["id"],
+            "last_expense_id": expenses[-1]["id"],
+            "category_breakdown": category_breakdown,
+            "total_amount": sum(category_breakdown.values())
+        }
+    )
+
+# Page size bounds for paginated expense listings
+EXPENSE_PAGE_MAX = int(os.getenv("EXPENSE_PAGE_MAX", "500"))
+
+def _check_cursor(group_id: str, cursor: str) -> str:
+    """A cursor is the id of the last expense on the previous page"""
+    expense = repository.get_expense(cursor)
+    if expense is None or expense["group_id"] != group_id:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return cursor
+
+def _expense_projection(fields: Optional[str]):
+    """Build a function that trims an expense to the requested fields.
+
+    fields is a comma-separated list of keys, or "summary" for everything
+    except the receipt_data blob; None keeps the full expense.
+    """
+    if not fields:
+        return None
+    if fields == "summary":
+        return lambda expense: {k: v for k, v in expense.items() if k != "receipt_data"}
+    
+    keys = [key.strip() for key in fields.split(",") if key.strip()]
+    return lambda expense: {k: expense[k] for k in keys if k in expense}
+
 @app.get("/groups/{group_id}/expenses", response_model=ApiResponse)
-async def get_group_expenses(group_id: str):
-    """Get all expenses for a group"""
-    if group_id not in groups_db:
+def get_group_expenses(
+    group_id: str,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: str = "json"
+):
+    """Get expenses for a group, newest first.
+
+    Without limit/cursor/fields this returns every expense in one response,
+    as the app expects. limit and cursor page through the list, fields
+    projects each expense (e.g. fields=summary drops receipt_data) and
+    format=ndjson streams one expense per line for exports. A paged NDJSON
+    response ends with a {"next_cursor": ..., "total_count": ...} line, and
+    the cursor is also sent in the X-Next-Cursor header.
+    """
+    if not repository.has_group(group_id):
         raise HTTPException(status_code=404, detail="Group not found")
     
-    # Get expenses for this group
-    group_expenses = [
-        expense for expense in expenses_db.values()
-        if expense["group_id"] == group_id
-    ]
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'ndjson'")
+    if limit is not None and not 1 <= limit <= EXPENSE_PAGE_MAX:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {EXPENSE_PAGE_MAX}")
+    
+    project = _expense_projection(fields)
+    after_id = _check_cursor(group_id, cursor) if cursor else None
     
-    # Calculate category breakdown
-    category_totals = {}
-    for expense in group_expenses:
-        category = expense["category"]
-        category_totals[category] = category_totals.get(category, 0) + expense["amount"]
+    if format == "ndjson":
+        if limit is None and after_id is None:
+            return StreamingResponse(
+                _ndjson_lines(repository.iter_group_expenses(group_id, newest_first=True), project),
+                media_type="application/x-ndjson"
+            )
+        group_expenses, next_cursor = repository.group_page(
+            group_id, limit or EXPENSE_PAGE_MAX, after_id=after_id
+        )
+        page = {"next_cursor": next_cursor, "total_count": repository.group_count(group_id)}
+        return StreamingResponse(
+            _ndjson_lines(group_expenses, project, trailer=page),
+            media_type="application/x-ndjson",
+            headers={"X-Next-Cursor": next_cursor} if next_cursor else None
+        )
+    
+    # Category breakdown is maintained on insert
+    category_totals = repository.category_totals(group_id)
+    
+    if limit is None and after_id is None:
+        # Expense ids are time-ordered, so newest first is descending id order
+        group_expenses = repository.group_expenses(group_id, newest_first=True)
+        next_cursor = None
+    else:
+        group_expenses, last_id = repository.group_page(
+            group_id, limit or EXPENSE_PAGE_MAX, after_id=after_id
+        )
+        next_cursor = last_id
+    
+    if project:
+        group_expenses = [project(e) for e in group_expenses]
     
-    # Sort by date (newest first)
-    group_expenses.sort(key=lambda x: x["created_at"], reverse=True)
+    data = {
+        "expenses": group_expenses,
+        "category_breakdown": category_totals,
+        "total_amount": sum(category_totals.values())
+    }
+    if limit is not None or after_id is not None:
+        data["next_cursor"] = next_cursor
+        data["total_count"] = repository.group_count(group_id)
     
     return ApiResponse(
         success=True,
         message=f"Found {len(group_expenses)} expenses",
-        data={
-            "expenses": group_expenses,
-            "category_breakdown": category_totals,
-            "total_amount": sum(exp["amount"] for exp in group_expenses)
-        }
+        data=data
     )
 
+def _ndjson_lines(expenses, project, trailer: Optional[Dict] = None):
+    """Yield expenses as NDJSON, a few hundred lines per chunk, then the trailer line if given"""
+    chunk = []
+    for expense in expenses:
+        chunk.append(json.dumps(project(expense) if project else expense))
+        if len(chunk) == 256:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+    if trailer is not None:
+        chunk.append(json.dumps(trailer))
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
 @app.post("/groups/{group_id}/calculate-settlement", response_model=ApiResponse)
-async def calculate_settlement(group_id: str):
+def calculate_settlement(group_id: str, verify: bool = False, engine: str = "greedy"):
     """Calculate optimal settlement to minimize transactions"""
     try:
-        if group_id not in groups_db:
+        group = repository.get_group(group_id)
+        if group is None:
             raise HTTPException(status_code=404, detail="Group not found")
         
-        # Get group expenses
-        group_expenses = [
-            expense for expense in expenses_db.values()
-            if expense["group_id"] == group_id
-        ]
+        if engine not in SETTLEMENT_ENGINES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown engine '{engine}', use one of: {', '.join(SETTLEMENT_ENGINES)}"
+            )
         
-        if not group_expenses:
+        if repository.group_count(group_id) == 0:
             return ApiResponse(
                 success=True,
                 message="No expenses to settle",
                 data={"settlements": [], "balances": {}}
             )
         
-        # Prepare data for settlement optimizer
-        adapted_expenses = []
-        for expense in group_expenses:
-            adapted_expenses.append({
-                "paid_by": expense["paid_by_user_id"],
-                "amount": expense["amount"],
-                "split_between": expense["split_among_user_ids"]
-            })
+        # Balances come from the ledger; history is only replayed in verify mode
+        balances = repository.balances(group_id)
+        ledger_check = None
+        if verify:
+            adapted_expenses = [settlement_view(e) for e in repository.iter_group_expenses(group_id)]
+            ledger_check = BalanceLedger.compare(balances, adapted_expenses)
+            if not ledger_check["consistent"]:
+                logger.warning(f"Ledger drift in {group_id}: {ledger_check['mismatched']}")
+                balances = ledger_check["recomputed_balances"]
+                repository.reset_balances(group_id, balances)
         
         # Calculate optimal settlements
         logger.info("Calculating optimal settlements...")
-        settlement_result = SettlementOptimizer.optimize_settlements(adapted_expenses)
+        settlement_result = SettlementOptimizer.settle_balances(
+            balances, engine, SETTLEMENT_TIME_BUDGET_MS
+        )
         
         # Format for UI
-        group_members = {m["id"]: m for m in groups_db[group_id]["members"]}
+        group_members = {m["id"]: m for m in group["members"]}
         settlements = []
         
         for settlement in settlement_result["optimal_settlements"]:
+            # Settlement math is in integer cents; convert only for the response
+            amount = from_cents(settlement["amount_cents"])
             from_user = group_members.get(settlement["from"], {"name": f"User {settlement['from']}"})
             to_user = group_members.get(settlement["to"], {"name": f"User {settlement['to']}"})
             
@@ -318,22 +715,32 @@ async def calculate_settlement(group_id: str):
                 "to_user_id": settlement["to"],
                 "from_user": from_user,
                 "to_user": to_user,
-                "amount": settlement["amount"],
-                "message": f"{from_user['name']} pays ₹{settlement['amount']:.2f} to {to_user['name']}"
+                "amount": amount,
+                "message": f"{from_user['name']} pays ₹{amount:.2f} to {to_user['name']}"
             })
         
         logger.info(f"Settlement optimized: {len(settlements)} transactions")
         
+        data = {
+            "settlements": settlements,
+            "balances": {uid: from_cents(bal) for uid, bal in settlement_result["balances"].items()},
+            "total_transactions": len(settlements),
+            "engine": settlement_result["engine"]
+        }
+        if ledger_check:
+            data["ledger_check"] = {
+                "consistent": ledger_check["consistent"],
+                "mismatched": {uid: from_cents(d) for uid, d in ledger_check["mismatched"].items()}
+            }
+        
         return ApiResponse(
             success=True,
             message=f"Settlement calculated: {len(settlements)} payments needed",
-            data={
-                "settlements": settlements,
-                "balances": settlement_result["balances"],
-                "total_transactions": len(settlements)
-            }
+            data=data
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Settlement calculation failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -346,23 +753,22 @@ async def get_categories():
         message="Categories retrieved",
         data={
             "categories": ExpenseCategorizer.CATEGORIES,
-            "examples": ExpenseCategorizer.CATEGORY_EXAMPLES,
+            "examples": expense_categorizer.category_examples,
             "ai_powered": expense_categorizer.use_llm
         }
     )
 
 # Startup
 if __name__ == "__main__":
-    import uvicorn
-    
     print("\n" + "="*60)
     print("🚀 SPLITWISE AI - EXPENSE SHARING API")
     print("="*60)
-    print("📱 Endpoints: 8")
+    print("📱 Endpoints: 12")
     print("📖 API Docs: http://localhost:8000/docs")
+    print("🏭 Production: python serve.py --workers N")
     print("🌐 Server: http://0.0.0.0:8000")
     print("🎯 Workflow: Scan → Categorize → Optimize")
     print("📱 Kotlin App: Use http://10.0.2.2:8000 (Android Emulator)")
     print("="*60 + "\n")
     
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,280 @@
+import gc
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """Process-wide holder for one expensive model instance.
+
+    The model is built once (on first use or on an explicit warm-up) and
+    shared by every request. If idle_unload_seconds is set, a background
+    watcher drops the instance after that long without use so the memory
+    can be given back; the next request loads it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        loader: Callable[[], Any],
+        idle_unload_seconds: Optional[float] = None,
+    ):
+        self.name = name
+        self.loader = loader
+        self.idle_unload_seconds = idle_unload_seconds or None
+
+        self._instance = None
+        self._lock = threading.Lock()
+        self._active = 0
+        self._last_used = 0.0
+        self._status = "not_loaded"
+        self._load_seconds = None
+        self._load_count = 0
+        self._error = None
+        self._watcher = None
+
+    def get(self) -> Any:
+        """Return the shared instance, loading it if needed"""
+        instance = self._instance
+        if instance is not None:
+            self._last_used = time.monotonic()
+            return instance
+
+        with self._lock:
+            if self._instance is None:
+                self._load_locked()
+            self._last_used = time.monotonic()
+            return self._instance
+
+    @contextmanager
+    def use(self):
+        """Borrow the instance; it will not be idle-unloaded while borrowed"""
+        with self._lock:
+            self._active += 1
+        try:
+            yield self.get()
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._last_used = time.monotonic()
+
+    def warm_up(self, background: bool = False) -> bool:
+        """Load the model ahead of the first request"""
+        if background:
+            thread = threading.Thread(
+                target=self.warm_up, name=f"{self.name}-warmup", daemon=True
+            )
+            thread.start()
+            return True
+
+        try:
+            self.get()
+            return True
+        except Exception as e:
+            logger.error(f"Warm-up of {self.name} failed: {e}")
+            return False
+
+    def unload(self) -> bool:
+        """Drop the shared instance so its memory can be reclaimed"""
+        with self._lock:
+            if self._instance is None or self._active > 0:
+                return False
+            self._instance = None
+            self._status = "unloaded"
+        gc.collect()
+        logger.info(f"Model {self.name} unloaded")
+        return True
+
+    def after_fork(self):
+        """Reset per-process state in a forked worker that inherited a loaded model.
+
+        Threads do not survive fork, so the idle watcher is started again
+        and the lock replaced in case it was copied while held.
+        """
+        self._lock = threading.Lock()
+        self._active = 0
+        self._watcher = None
+        self._last_used = time.monotonic()
+        if self._instance is not None:
+            self._start_watcher()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._instance is not None
+
+    def status(self) -> Dict:
+        idle_for = None
+        if self._instance is not None and self._last_used:
+            idle_for = round(time.monotonic() - self._last_used, 1)
+
+        return {
+            "name": self.name,
+            "status": self._status,
+            "resident": self.is_loaded,
+            "active_requests": self._active,
+            "load_count": self._load_count,
+            "load_seconds": self._load_seconds,
+            "idle_seconds": idle_for,
+            "idle_unload_seconds": self.idle_unload_seconds,
+            "error": self._error,
+        }
+
+    def _load_locked(self):
+        self._status = "loading"
+        logger.info(f"Loading model {self.name}...")
+        started = time.perf_counter()
+        try:
+            self._instance = self.loader()
+        except Exception as e:
+            self._status = "failed"
+            self._error = str(e)
+            raise
+
+        self._load_seconds = round(time.perf_counter() - started, 2)
+        self._load_count += 1
+        self._status = "ready"
+        self._error = None
+        logger.info(f"Model {self.name} loaded in {self._load_seconds}s")
+        self._start_watcher()
+
+    def _start_watcher(self):
+        if not self.idle_unload_seconds:
+            return
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+
+        self._watcher = threading.Thread(
+            target=self._watch_idle, name=f"{self.name}-idle", daemon=True
+        )
+        self._watcher.start()
+
+    def _watch_idle(self):
+        interval = max(1.0, min(self.idle_unload_seconds / 4, 60.0))
+        while self._instance is not None:
+            time.sleep(interval)
+            idle_for = time.monotonic() - self._last_used
+            if self._active == 0 and idle_for >= self.idle_unload_seconds:
+                if self.unload():
+                    return
+
+
+class _PoolEntry:
+    def __init__(self, size: int):
+        self.idle: List[Any] = []
+        self.slots = threading.BoundedSemaphore(size)
+        self.in_use = 0
+
+
+class ReaderPool:
+    """Bounded LRU pool of pre-built readers keyed by configuration.
+
+    Each key (e.g. a language tuple plus GPU flag) holds up to
+    readers_per_key instances. Callers check a reader out and hand it back
+    when done; if every reader for the key is busy they wait for one rather
+    than building their own. At most max_keys configurations are kept, the
+    least recently used idle one is evicted first.
+    """
+
+    def __init__(
+        self,
+        builder: Callable[[Hashable], Any],
+        max_keys: int = 2,
+        readers_per_key: int = 1,
+    ):
+        self.builder = builder
+        self.max_keys = max(1, max_keys)
+        self.readers_per_key = max(1, readers_per_key)
+
+        self._entries: "OrderedDict[Hashable, _PoolEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @contextmanager
+    def checkout(self, key: Hashable, timeout: Optional[float] = None):
+        """Borrow a reader for key, building one only if none can be reused"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _PoolEntry(self.readers_per_key)
+                self._entries[key] = entry
+            self._entries.move_to_end(key)
+            entry.in_use += 1
+            self._evict_locked()
+
+        try:
+            if not entry.slots.acquire(timeout=timeout):
+                raise TimeoutError(f"No reader available for {key}")
+        except BaseException:
+            with self._lock:
+                entry.in_use -= 1
+            raise
+
+        reader = None
+        try:
+            with self._lock:
+                reader = entry.idle.pop() if entry.idle else None
+                if reader is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+
+            if reader is None:
+                logger.info(f"Building reader for {key}")
+                reader = self.builder(key)
+
+            yield reader
+        finally:
+            with self._lock:
+                if reader is not None:
+                    entry.idle.append(reader)
+                entry.in_use -= 1
+            entry.slots.release()
+
+    def warm_up(self, key: Hashable) -> bool:
+        """Build a reader for key ahead of the first checkout, unless one is pooled"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.idle:
+                return True
+        try:
+            with self.checkout(key):
+                pass
+            return True
+        except Exception as e:
+            logger.error(f"Warm-up of reader {key} failed: {e}")
+            return False
+
+    def clear(self):
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e.in_use == 0]:
+                del self._entries[key]
+        gc.collect()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "keys": [str(key) for key in self._entries],
+            "max_keys": self.max_keys,
+            "readers_per_key": self.readers_per_key,
+        }
+
+    def _evict_locked(self):
+        while len(self._entries) > self.max_keys:
+            victim = next((k for k, e in self._entries.items() if e.in_use == 0), None)
+            if victim is None:
+                return
+            del self._entries[victim]
+            self.evictions += 1
+            logger.info(f"Evicted reader for {victim}")
@@ -0,0 +1,150 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ReceiptResultCache:
+    """Content-addressed cache of receipt extraction results.
+
+    Entries are keyed by the SHA-256 of the uploaded bytes, so only a
+    byte-identical re-upload hits. The memory tier is an LRU of max_entries; if disk_dir is set,
+    results are also written there as JSON and survive restarts. Entries
+    expire after ttl_seconds.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: float = 86400.0,
+        disk_dir: Optional[str] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir or None
+
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def content_hash(image_bytes: bytes) -> str:
+        return hashlib.sha256(image_bytes).hexdigest()
+
+    def get(self, content_key: str, size_bytes: int = 0) -> Optional[Dict]:
+        """Exact lookup by content hash (memory, then disk)"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._get_live_locked(content_key)
+            if entry is not None:
+                self.hits += 1
+                self.bytes_saved += size_bytes
+                return json.loads(entry["result"])
+
+        entry = self._read_disk(content_key)
+        if entry is not None:
+            with self._lock:
+                self._store_locked(content_key, entry)
+                self.hits += 1
+                self.disk_hits += 1
+                self.bytes_saved += size_bytes
+            return json.loads(entry["result"])
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, content_key: str, result: Dict):
+        if not self.enabled:
+            return
+
+        entry = {
+            "result": json.dumps(result),
+            "expires_at": time.time() + self.ttl_seconds,
+        }
+        with self._lock:
+            self._store_locked(content_key, entry)
+        self._write_disk(content_key, entry)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "disk_dir": self.disk_dir,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+        }
+
+    def _get_live_locked(self, key: str, touch: bool = True) -> Optional[Dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry["expires_at"] <= time.time():
+            del self._entries[key]
+            return None
+        if touch:
+            self._entries.move_to_end(key)
+        return entry
+
+    def _store_locked(self, key: str, entry: Dict):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read_disk(self, content_key: str) -> Optional[Dict]:
+        if not self.disk_dir:
+            return None
+        path = os.path.join(self.disk_dir, f"{content_key}.json")
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("expires_at", 0) <= time.time():
+            self._remove_disk(path)
+            return None
+        return entry
+
+    def _write_disk(self, content_key: str, entry: Dict):
+        if not self.disk_dir:
+            return
+        try:
+            path = os.path.join(self.disk_dir, f"{content_key}.json")
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write receipt cache entry: {e}")
+
+    @staticmethod
+    def _remove_disk(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -1,86 +1,379 @@
-import torch
-from transformers import DonutProcessor, VisionEncoderDecoderModel
-from PIL import Image, ImageEnhance, ImageFilter
-import requests
+from PIL import Image
 import re
 import json
-from typing import Dict, List, Optional, Union
+from typing import Callable, Dict, List, Optional, Union
 import logging
 import io
-import cv2
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
 import numpy as np
 
+from model_registry import ModelRegistry, ReaderPool
+from receipt_cache import ReceiptResultCache
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-try:
-    import easyocr
-    EASYOCR_AVAILABLE = True
-except ImportError:
-    EASYOCR_AVAILABLE = False
-    logger.warning("EasyOCR not available. Install with: pip install easyocr")
+# The OCR stack takes seconds and hundreds of MB to import, so it is loaded
+# on the first scan or warm-up rather than when the API starts
+torch = None
+DonutProcessor = None
+VisionEncoderDecoderModel = None
+easyocr = None
+EASYOCR_AVAILABLE = False
+_ocr_import_lock = threading.Lock()
+
+def load_ocr_dependencies() -> bool:
+    """Import torch and transformers (plus EasyOCR if installed) once"""
+    global torch, DonutProcessor, VisionEncoderDecoderModel, easyocr, EASYOCR_AVAILABLE
+    if torch is not None:
+        return True
+    
+    with _ocr_import_lock:
+        if torch is not None:
+            return True
+        try:
+            from transformers import DonutProcessor as _DonutProcessor
+            from transformers import VisionEncoderDecoderModel as _VisionEncoderDecoderModel
+            import torch as _torch
+        except ImportError as e:
+            logger.warning(f"OCR dependencies not available: {e}")
+            return False
+        
+        try:
+            import easyocr as _easyocr
+            easyocr = _easyocr
+            EASYOCR_AVAILABLE = True
+        except ImportError:
+            logger.warning("EasyOCR not available. Install with: pip install easyocr")
+        
+        DonutProcessor = _DonutProcessor
+        VisionEncoderDecoderModel = _VisionEncoderDecoderModel
+        _configure_torch_threads(_torch)
+        # Published last: torch being set means everything else is in place
+        torch = _torch
+        logger.info("OCR dependencies loaded")
+        return True
+
+# Per-process torch thread pools; 0 keeps torch's default (all cores). serve.py
+# gives each worker cpu_count // workers intra-op threads unless this is set
+TORCH_INTRA_OP_THREADS = int(os.getenv("TORCH_INTRA_OP_THREADS", "0"))
+TORCH_INTER_OP_THREADS = int(os.getenv("TORCH_INTER_OP_THREADS", "0"))
+
+def _configure_torch_threads(torch_module):
+    if TORCH_INTRA_OP_THREADS:
+        torch_module.set_num_threads(TORCH_INTRA_OP_THREADS)
+    if TORCH_INTER_OP_THREADS:
+        try:
+            torch_module.set_num_interop_threads(TORCH_INTER_OP_THREADS)
+        except RuntimeError as e:
+            # Only allowed once, before any inter-op work has started
+            logger.warning(f"Could not set inter-op threads: {e}")
+    logger.info(f"torch threads: {torch_module.get_num_threads()} intra-op, "
+                f"{torch_module.get_num_interop_threads()} inter-op")
+
+# "int8" applies dynamic int8 quantization to the Linear layers when running
+# on CPU, converting the fp32 checkpoint at every load
+DONUT_PRECISION = os.getenv("DONUT_PRECISION", "fp32")
+DONUT_PRECISIONS = ("fp32", "int8")
+
+# Receipts are decoded greedily first. Only those without a parseable total,
+# or whose sequence confidence (geometric mean of token probabilities) is
+# below DONUT_MIN_CONFIDENCE, are decoded again with DONUT_RETRY_BEAMS beams.
+# The confidence check is off (0) until benchmarks/adaptive_decoding.py has
+# picked a threshold on labelled receipts. DONUT_RETRY_BEAMS=1 turns the retry off
+DONUT_MIN_CONFIDENCE = float(os.getenv("DONUT_MIN_CONFIDENCE", "0"))
+DONUT_RETRY_BEAMS = int(os.getenv("DONUT_RETRY_BEAMS", "4"))
+
+# Preprocessing profiles, selectable per scan. All run on a grayscale array
+# already downscaled to the Donut input size:
+#   fast        - contrast stretch only, the model copes with the rest
+#   balanced    - adaptive threshold, median despeckle, contrast, unsharp mask
+#   max-quality - the original chain's steps (NL-means denoise, sharpen) at capped size
+# No profile reproduces the original full-resolution output: all of them
+# downscale first and convert to grayscale with OpenCV. On 3000x4000 photos
+# (benchmarks/preprocess_profiles.py) balanced takes ~0.2 s against ~8 s
+# for max-quality, but max-quality stays closest to the original output and
+# remains the default until a --labels run of that benchmark shows balanced
+# extracts totals as accurately
+PREPROCESS_PROFILES = {
+    "fast": {"threshold": False, "denoise": None, "contrast": 1.5, "sharpness": 1.0, "unsharp": 0.0},
+    "balanced": {"threshold": True, "denoise": "median", "contrast": 2.0, "sharpness": 1.0, "unsharp": 1.5},
+    "max-quality": {"threshold": True, "denoise": "nlmeans", "contrast": 2.0, "sharpness": 2.0, "unsharp": 1.5},
+}
+DEFAULT_PREPROCESS_PROFILE = os.getenv("PREPROCESS_PROFILE", "max-quality")
+
+# Donut CORD-v2 input size (height, width); the scanner reads the real one from its processor
+DONUT_INPUT_SIZE = (2560, 1920)
+
+# Images that would decode to more pixels than this are refused before
+# decoding (decompression bombs). Checked after JPEG draft scaling, so
+# large phone photos pass; bounds a non-JPEG decode to ~160 MB of RGB
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", "40000000"))
+
+def _fit_scale(width: int, height: int, max_size) -> float:
+    """Scale at which the image fits max_size in either orientation, never above 1"""
+    return min(1.0, max(max_size) / max(width, height), min(max_size) / min(width, height))
+
+def decode_receipt_image(source, max_size=DONUT_INPUT_SIZE, mode: str = "RGB") -> Image.Image:
+    """
+    Decode receipt bytes (or a file object) to mode, no larger than max_size.
+    
+    JPEGs are decoded in draft mode: libjpeg scales by 1/2, 1/4 or 1/8
+    while decoding (the smallest that still covers max_size) and, for
+    mode "L", decodes only the luminance channel. Other formats are
+    converted and shrunk right after decoding. The size that will really
+    be decoded is checked against MAX_IMAGE_PIXELS from the header alone.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    image = Image.open(source)
+    
+    width, height = image.size
+    scale = _fit_scale(width, height, max_size)
+    target = (max(1, round(width * scale)), max(1, round(height * scale)))
+    if image.format == "JPEG":
+        # Only sets up the decoder; image.size becomes the scaled size
+        image.draft(mode, target)
+    
+    if image.width * image.height > MAX_IMAGE_PIXELS:
+        raise ValueError(f"Image is {width}x{height}, over the {MAX_IMAGE_PIXELS} pixel limit")
+    
+    image.load()
+    if image.mode != mode:
+        image = image.convert(mode)
+    if image.size != target:
+        image = image.resize(target, Image.BOX)
+    return image
+
+def preprocess_receipt(image: Image.Image, profile: Optional[str] = None,
+                       max_size=DONUT_INPUT_SIZE) -> np.ndarray:
+    """
+    Prepare a receipt photo for Donut as an RGB uint8 array.
+    
+    The image is first shrunk to what the Donut processor would resize it
+    to anyway, so every filter runs on at most max_size pixels instead of
+    the full phone photo, then filtered in one grayscale NumPy/OpenCV pass.
+    """
+    import cv2
+    
+    profile = profile or DEFAULT_PREPROCESS_PROFILE
+    if profile not in PREPROCESS_PROFILES:
+        raise ValueError(f"Unknown preprocessing profile: {profile}")
+    settings = PREPROCESS_PROFILES[profile]
+    
+    gray = np.asarray(image.convert("L"))
+    
+    # Donut fits the image into max_size with either orientation; never upscale here
+    height, width = gray.shape
+    scale = _fit_scale(width, height, max_size)
+    if scale < 1.0:
+        gray = cv2.resize(gray, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+    
+    if settings["threshold"]:
+        # Handles uneven lighting across the receipt
+        gray = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+    
+    if settings["denoise"] == "nlmeans":
+        gray = cv2.fastNlMeansDenoising(gray, None, 10, 7, 21)
+    elif settings["denoise"] == "median":
+        gray = cv2.medianBlur(gray, 3)
+    
+    contrast = settings["contrast"]
+    if contrast != 1.0:
+        # Same as PIL ImageEnhance.Contrast: scale the distance from the mean
+        # (addWeighted saturates to 0..255; convertScaleAbs would fold negatives back up)
+        mean = int(gray.mean() + 0.5)
+        gray = cv2.addWeighted(gray, contrast, gray, 0, (1 - contrast) * mean)
+    
+    sharpness = settings["sharpness"]
+    if sharpness != 1.0:
+        # Same as PIL ImageEnhance.Sharpness: blend with its 3x3 smoothing kernel
+        smooth = np.array([[1, 1, 1], [1, 5, 1], [1, 1, 1]], dtype=np.float32) / 13
+        identity = np.zeros((3, 3), dtype=np.float32)
+        identity[1, 1] = 1
+        gray = cv2.filter2D(gray, -1, sharpness * identity + (1 - sharpness) * smooth)
+    
+    amount = settings["unsharp"]
+    if amount:
+        # PIL UnsharpMask(radius=2, percent=150, threshold=3)
+        blurred = cv2.GaussianBlur(gray, (0, 0), 2)
+        diff = gray.astype(np.int16) - blurred
+        sharpened = np.clip(gray + amount * diff, 0, 255).astype(np.uint8)
+        gray = np.where(np.abs(diff) >= 3, sharpened, gray)
+    
+    return cv2.cvtColor(gray, cv2.COLOR_GRAY2RGB)
+
+class DonutBatcher:
+    """Collects work from concurrent callers and runs it as one batch.
+
+    A batch is flushed when max_batch_size items are waiting or max_wait_ms
+    has passed since the first one arrived. run_batch receives the list of
+    items and returns one result (or Exception) per item, in order. The
+    worker thread exits after a quiet period and restarts on demand.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List], List],
+        max_batch_size: int = 4,
+        max_wait_ms: float = 20.0,
+        idle_exit_seconds: float = 30.0,
+    ):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.idle_exit_seconds = idle_exit_seconds
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, item):
+        """Queue item and block until its batch has been processed"""
+        future: Future = Future()
+        self._queue.put((item, future))
+        with self._lock:
+            # A worker inherited through fork is not running in this process
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name="donut-batcher", daemon=True
+                )
+                self._worker.start()
+        return future.result()
+
+    def stats(self) -> Dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+        }
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.idle_exit_seconds)
+            except queue.Empty:
+                with self._lock:
+                    if self._queue.empty():
+                        self._worker = None
+                        return
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self.batches += 1
+            self.items += len(batch)
+            try:
+                results = self.run_batch([item for item, _ in batch])
+            except Exception as e:
+                results = [e] * len(batch)
+
+            for (_, future), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
 
 class DonutReceiptScanner:
-    def __init__(self, model_name: str = "naver-clova-ix/donut-base-finetuned-cord-v2"):
+    def __init__(self, model_name: str = "naver-clova-ix/donut-base-finetuned-cord-v2",
+                 precision: Optional[str] = None):
         """
         Initialize Donut Receipt Scanner
         
         Args:
             model_name: Hugging Face model name for Donut
+            precision: "fp32" or "int8" (CPU only), default DONUT_PRECISION
         """
+        if not load_ocr_dependencies():
+            raise RuntimeError("Receipt scanning needs torch and transformers installed")
+        
+        precision = precision or DONUT_PRECISION
+        if precision not in DONUT_PRECISIONS:
+            raise ValueError(f"Unknown Donut precision: {precision}")
+        
         self.model_name = model_name
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        logger.info(f"Using device: {self.device}")
+        if precision == "int8" and self.device != "cpu":
+            logger.warning("int8 Donut quantization is CPU-only, using fp32 on GPU")
+            precision = "fp32"
+        self.precision = precision
+        logger.info(f"Using device: {self.device} ({self.precision})")
         
         # Load processor and model
         self.processor = DonutProcessor.from_pretrained(model_name)
-        self.model = VisionEncoderDecoderModel.from_pretrained(model_name)
-        self.model.to(self.device)
+        if self.precision == "int8":
+            self.model = self._load_quantized_model()
+        else:
+            self.model = VisionEncoderDecoderModel.from_pretrained(model_name)
+            self.model.to(self.device)
         self.model.eval()
         
+        # Size the processor resizes to; preprocessing never works above it
+        size = getattr(getattr(self.processor, "image_processor", None), "size", None)
+        if isinstance(size, dict):
+            self.input_size = (size.get("height", DONUT_INPUT_SIZE[0]), size.get("width", DONUT_INPUT_SIZE[1]))
+        elif isinstance(size, (list, tuple)) and len(size) == 2:
+            self.input_size = (size[1], size[0])
+        else:
+            self.input_size = DONUT_INPUT_SIZE
+        
+        # How often beam search was needed after the greedy pass
+        self.greedy_decodes = 0
+        self.beam_retries = 0
+        
+        # Concurrent scans share one generate() call; batch size 1 disables batching
+        self.batcher = None
+        max_batch_size = int(os.getenv("DONUT_BATCH_MAX_SIZE", "4"))
+        if max_batch_size > 1:
+            self.batcher = DonutBatcher(
+                self.generate_batch,
+                max_batch_size=max_batch_size,
+                max_wait_ms=float(os.getenv("DONUT_BATCH_MAX_WAIT_MS", "20")),
+            )
+        
         logger.info("Donut model loaded successfully")
     
-    def preprocess_image(self, image: Image.Image) -> Image.Image:
-        """
-        Advanced preprocessing for better OCR accuracy
+    def _load_quantized_model(self):
         """
-        # Convert to RGB if necessary
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
+        Donut with every nn.Linear dynamically quantized to int8.
         
-        # Convert to numpy array for OpenCV processing
-        img_array = np.array(image)
-        
-        # Convert to grayscale for better text detection
-        gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-        
-        # Apply adaptive thresholding to handle varying lighting
-        gray = cv2.adaptiveThreshold(
-            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
-        )
-        
-        # Denoise
-        gray = cv2.fastNlMeansDenoising(gray, None, 10, 7, 21)
-        
-        # Convert back to PIL Image
-        image = Image.fromarray(gray)
-        
-        # Convert back to RGB (3 channels) for model compatibility
-        image = image.convert('RGB')
-        
-        # Enhance contrast
-        enhancer = ImageEnhance.Contrast(image)
-        image = enhancer.enhance(2.0)  # Increased from 1.5
-        
-        # Enhance sharpness
-        enhancer = ImageEnhance.Sharpness(image)
-        image = enhancer.enhance(2.0)  # Increased from 1.2
-        
-        # Apply unsharp mask for better edge detection
-        image = image.filter(ImageFilter.UnsharpMask(radius=2, percent=150, threshold=3))
-        
-        return image
+        Weights are stored as int8 and activations quantized on the fly,
+        which is where Swin and mBART spend most of their CPU time. The
+        conversion runs at every load rather than being cached: it takes
+        seconds next to the fp32 load it needs anyway, and a pickled module
+        could only be read back with torch.load(weights_only=False).
+        """
+        model = VisionEncoderDecoderModel.from_pretrained(self.model_name)
+        model.eval()
+        started = time.perf_counter()
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        logger.info(f"Quantized Donut to int8 in {time.perf_counter() - started:.1f}s")
+        return model
+    
+    def preprocess_image(self, image: Image.Image, profile: Optional[str] = None) -> Image.Image:
+        """
+        Preprocess for OCR with the given profile (see PREPROCESS_PROFILES)
+        """
+        return Image.fromarray(preprocess_receipt(image, profile, self.input_size))
     
     def load_image(self, image_source: str) -> Image.Image:
         """
@@ -88,10 +381,12 @@ class DonutReceiptScanner:
         """
         try:
             if image_source.startswith('http'):
+                import requests
                 response = requests.get(image_source, stream=True, timeout=30)
-                image = Image.open(response.raw)
+                image = decode_receipt_image(response.raw, self.input_size)
             else:
-                image = Image.open(image_source)
+                with open(image_source, "rb") as f:
+                    image = decode_receipt_image(f, self.input_size)
             
             return self.preprocess_image(image)
         except Exception as e:
@@ -113,44 +408,14 @@ class DonutReceiptScanner:
             # Load and preprocess image
             image = self.load_image(image_source)
             
-            # Prepare inputs
-            task_prompt = "<s_cord-v2>"
-            decoder_input_ids = self.processor.tokenizer(
-                task_prompt, 
-                add_special_tokens=False, 
-                return_tensors="pt"
-            ).input_ids
-            
             # Process image
             pixel_values = self.processor(image, return_tensors="pt").pixel_values
             
-            # Generate output
-            with torch.no_grad():
-                outputs = self.model.generate(
-                    pixel_values.to(self.device),
-                    decoder_input_ids=decoder_input_ids.to(self.device),
-                    max_length=max_length,
-                    early_stopping=True,
-                    pad_token_id=self.processor.tokenizer.pad_token_id,
-                    eos_token_id=self.processor.tokenizer.eos_token_id,
-                    use_cache=True,
-                    num_beams=5,  # Increased for better accuracy
-                    bad_words_ids=[[self.processor.tokenizer.unk_token_id]],
-                    return_dict_in_generate=True,
-                    output_scores=True,
-                    length_penalty=1.0,
-                    repetition_penalty=1.2,
-                )
-            
-            # Decode output
-            sequence = self.processor.batch_decode(outputs.sequences)[0]
-            sequence = self.clean_sequence(sequence)
-            
-            # Convert to JSON
-            result = self.processor.token2json(sequence)
-            
-            # Post-process results
-            processed_result = self.post_process_results(result)
+            # Greedy decode, beam search only if the result is not trustworthy.
+            # This path has always used a repetition penalty; the batched PIL path has not
+            processed_result = self.generate_batch([(pixel_values, max_length)], repetition_penalty=1.2)[0]
+            if isinstance(processed_result, Exception):
+                raise processed_result
             
             logger.info("Successfully extracted receipt data")
             return processed_result
@@ -181,7 +446,7 @@ class DonutReceiptScanner:
         
         return sequence
     
-    def post_process_results(self, raw_result: Dict) -> Dict:
+    def post_process_results(self, raw_result: Dict, confidence: float) -> Dict:
         """
         Post-process and validate extracted results
         """
@@ -194,7 +459,7 @@ class DonutReceiptScanner:
             "tax": raw_result.get("tax", "0.00"),
             "items": self.extract_items(raw_result),
             "currency": "USD",
-            "confidence": 0.8,  # Placeholder for confidence score
+            "confidence": confidence,
             "raw_result": raw_result
         }
         
@@ -357,50 +622,191 @@ class DonutReceiptScanner:
             "device": self.device,
             "processor_type": type(self.processor).__name__,
             "model_type": type(self.model).__name__,
-            "vocab_size": self.processor.tokenizer.vocab_size
+            "vocab_size": self.processor.tokenizer.vocab_size,
+            "precision": self.precision,
+            "greedy_decodes": self.greedy_decodes,
+            "beam_retries": self.beam_retries
         }
 
-    def extract_receipt_from_pil(self, image: Image.Image, max_length: int = 768) -> Dict:
+    def extract_receipt_from_pil(self, image: Image.Image, max_length: int = 768,
+                                 profile: Optional[str] = None) -> Dict:
         """
         Extract receipt data when caller already has a PIL Image (e.g. from bytes).
         """
         try:
-            # Ensure image is preprocessed similar to load_image
-            image = self.preprocess_image(image)
+            # The processor takes the preprocessed array directly, no PIL round trip
+            pixels = preprocess_receipt(image, profile, self.input_size)
+            pixel_values = self.processor(pixels, return_tensors="pt").pixel_values
 
-            task_prompt = "<s_cord-v2>"
-            decoder_input_ids = self.processor.tokenizer(
-                task_prompt,
-                add_special_tokens=False,
-                return_tensors="pt"
-            ).input_ids
-
-            pixel_values = self.processor(image, return_tensors="pt").pixel_values
-
-            with torch.no_grad():
-                outputs = self.model.generate(
-                    pixel_values.to(self.device),
-                    decoder_input_ids=decoder_input_ids.to(self.device),
-                    max_length=max_length,
-                    early_stopping=True,
-                    pad_token_id=self.processor.tokenizer.pad_token_id,
-                    eos_token_id=self.processor.tokenizer.eos_token_id,
-                    use_cache=True,
-                    num_beams=2,
-                    bad_words_ids=[[self.processor.tokenizer.unk_token_id]],
-                    return_dict_in_generate=True,
-                    output_scores=True,
-                )
+            if self.batcher is not None:
+                return self.batcher.submit((pixel_values, max_length))
 
-            sequence = self.processor.batch_decode(outputs.sequences)[0]
-            sequence = self.clean_sequence(sequence)
-            result = self.processor.token2json(sequence)
-            processed_result = self.post_process_results(result)
-            return processed_result
+            result = self.generate_batch([(pixel_values, max_length)])[0]
+            if isinstance(result, Exception):
+                raise result
+            return result
         except Exception as e:
             logger.error(f"Error extracting receipt from PIL image: {e}")
             raise
 
+    def generate_batch(self, batch: List, repetition_penalty: float = 1.0) -> List:
+        """
+        Decode stacked (pixel_values, max_length) items, greedy first.
+
+        Items whose greedy result has low confidence or no parseable total
+        are decoded again together with beam search, and the better of the
+        two results is kept; if the retry itself raises, the greedy results
+        are returned. Returns one post-processed result per item, or the
+        Exception raised while decoding that item so one bad receipt does
+        not fail the batch.
+        """
+        pixel_values = torch.cat([item[0] for item in batch])
+        max_length = max(item[1] for item in batch)
+
+        results = self._decode(pixel_values, max_length, num_beams=1, repetition_penalty=repetition_penalty)
+        self.greedy_decodes += len(batch)
+
+        retry = [i for i, result in enumerate(results) if self._needs_retry(result)]
+        if retry and DONUT_RETRY_BEAMS > 1:
+            self.beam_retries += len(retry)
+            try:
+                beam_results = self._decode(
+                    pixel_values[retry], max_length, num_beams=DONUT_RETRY_BEAMS,
+                    repetition_penalty=repetition_penalty
+                )
+            except Exception as e:
+                # The greedy results stand; a failed retry must not fail the batch
+                logger.warning(f"Beam search retry of {len(retry)} receipts failed: {e}")
+                return results
+            for i, beam_result in zip(retry, beam_results):
+                if self._better(beam_result, results[i]):
+                    results[i] = beam_result
+        return results
+
+    def _decode(self, pixel_values, max_length: int, num_beams: int, repetition_penalty: float = 1.0) -> List:
+        task_prompt = "<s_cord-v2>"
+        decoder_input_ids = self.processor.tokenizer(
+            task_prompt,
+            add_special_tokens=False,
+            return_tensors="pt"
+        ).input_ids.repeat(len(pixel_values), 1)
+
+        with torch.no_grad():
+            outputs = self.model.generate(
+                pixel_values.to(self.device),
+                decoder_input_ids=decoder_input_ids.to(self.device),
+                max_length=max_length,
+                early_stopping=num_beams > 1,
+                pad_token_id=self.processor.tokenizer.pad_token_id,
+                eos_token_id=self.processor.tokenizer.eos_token_id,
+                use_cache=True,
+                num_beams=num_beams,
+                repetition_penalty=repetition_penalty,
+                do_sample=False,
+                bad_words_ids=[[self.processor.tokenizer.unk_token_id]],
+                return_dict_in_generate=True,
+                output_scores=True,
+            )
+            confidences = self._sequence_confidences(outputs, decoder_input_ids.shape[1], num_beams)
+
+        results = []
+        for sequence, confidence in zip(self.processor.batch_decode(outputs.sequences), confidences):
+            try:
+                sequence = self.clean_sequence(sequence)
+                result = self.post_process_results(self.processor.token2json(sequence), confidence)
+                result["decoding"] = "greedy" if num_beams == 1 else f"beam{num_beams}"
+                results.append(result)
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def _sequence_confidences(self, outputs, prompt_length: int, num_beams: int) -> List[float]:
+        """Geometric mean of the chosen tokens' probabilities, per sequence.
+
+        Greedy and beam results are scored the same way, from the
+        renormalized per-step scores, so the two are comparable. The beam's
+        own sequences_scores is length-penalized and not used.
+        """
+        log_probs = self.model.compute_transition_scores(
+            outputs.sequences,
+            outputs.scores,
+            outputs.beam_indices if num_beams > 1 else None,
+            normalize_logits=True
+        )
+        tokens = outputs.sequences[:, prompt_length:]
+        steps = min(tokens.shape[1], log_probs.shape[1])
+        tokens, log_probs = tokens[:, :steps], log_probs[:, :steps]
+        # Steps after a sequence has ended only emit padding
+        generated = tokens != self.processor.tokenizer.pad_token_id
+        log_probs = torch.where(generated, log_probs, torch.zeros_like(log_probs))
+        mean = log_probs.sum(dim=1) / generated.sum(dim=1).clamp(min=1)
+        return [round(float(value), 4) for value in torch.exp(mean)]
+
+    @staticmethod
+    def _has_total(result) -> bool:
+        return not isinstance(result, Exception) and float(result["total_amount"]) > 0
+
+    def _needs_retry(self, result) -> bool:
+        return not self._has_total(result) or result["confidence"] < DONUT_MIN_CONFIDENCE
+
+    def _better(self, candidate, current) -> bool:
+        """Prefer a result with a total, then the more confident one"""
+        if isinstance(candidate, Exception):
+            return False
+        if isinstance(current, Exception):
+            return True
+        if self._has_total(candidate) != self._has_total(current):
+            return self._has_total(candidate)
+        return candidate["confidence"] > current["confidence"]
+
+
+# Shared Donut instance: loaded once per process instead of once per scan
+donut_registry = ModelRegistry(
+    "donut",
+    DonutReceiptScanner,
+    idle_unload_seconds=float(os.getenv("DONUT_IDLE_UNLOAD_SECONDS", "0")),
+)
+
+def warm_up_easyocr() -> bool:
+    """Build the default EasyOCR reader so the first fallback does not pay for it"""
+    if not load_ocr_dependencies() or not EASYOCR_AVAILABLE:
+        return False
+    return easyocr_pool.warm_up((EASYOCR_LANGUAGES, torch.cuda.is_available()))
+
+def warm_up_worker():
+    """Executor initializer: preload the model and OCR reader in each inference worker process"""
+    donut_registry.warm_up()
+    warm_up_easyocr()
+
+def worker_status() -> Dict:
+    """Model, reader pool and cache state of the process that runs scans"""
+    return {
+        "models": {"donut": donut_registry.status()},
+        "easyocr_pool": easyocr_pool.stats(),
+        "receipt_cache": receipt_cache.stats(),
+    }
+
+# English and Hindi for Indian receipts
+EASYOCR_LANGUAGES = ('en', 'hi')
+
+def _build_easyocr_reader(key) -> "easyocr.Reader":
+    languages, gpu = key
+    return easyocr.Reader(list(languages), gpu=gpu)
+
+# Pre-built EasyOCR readers keyed by (languages, gpu), shared by all fallbacks
+easyocr_pool = ReaderPool(
+    _build_easyocr_reader,
+    max_keys=int(os.getenv("EASYOCR_POOL_KEYS", "2")),
+    readers_per_key=int(os.getenv("EASYOCR_READERS_PER_KEY", "1")),
+)
+
+# Re-uploads of the same receipt reuse the earlier extraction
+receipt_cache = ReceiptResultCache(
+    max_entries=int(os.getenv("RECEIPT_CACHE_SIZE", "256")),
+    ttl_seconds=float(os.getenv("RECEIPT_CACHE_TTL_SECONDS", "86400")),
+    disk_dir=os.getenv("RECEIPT_CACHE_DIR"),
+)
+
 
 class ReceiptScanner:
     """High-level scanner for FastAPI.
@@ -409,20 +815,36 @@ class ReceiptScanner:
     Returns: dict with total_amount, vendor, raw_text, items
     """
     @staticmethod
-    def scan_receipt(image_bytes: bytes) -> Dict:
+    def scan_receipt(image_bytes: bytes, profile: Optional[str] = None) -> Dict:
+        profile = profile or DEFAULT_PREPROCESS_PROFILE
+        # Results are cached per preprocessing profile and model precision
+        content_key = f"{receipt_cache.content_hash(image_bytes)}-{profile}-{DONUT_PRECISION}"
+        cached = receipt_cache.get(content_key, len(image_bytes))
+        if cached is not None:
+            logger.info("Receipt cache hit (identical upload)")
+            return cached
+
         try:
-            img = Image.open(io.BytesIO(image_bytes))
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
+            # Bounded decode: draft-mode JPEG at the Donut input size, bomb check first.
+            # Grayscale, as preprocessing and EasyOCR both use luminance
+            img = decode_receipt_image(image_bytes, mode="L")
         except Exception as e:
             logger.error(f"Failed to open image: {e}")
             return {"total_amount": 0.0, "vendor": "Error", "raw_text": "", "error": str(e)}
 
+        result = ReceiptScanner._scan_image(img, profile)
+        # Only successful extractions are cached so a retry can still improve on a miss
+        if result.get("total_amount") and "error" not in result:
+            receipt_cache.put(content_key, result)
+        return result
+
+    @staticmethod
+    def _scan_image(img: Image.Image, profile: str) -> Dict:
         # Try Donut AI first
         donut_result = None
         try:
-            donut = DonutReceiptScanner()
-            donut_result = donut.extract_receipt_from_pil(img)
+            with donut_registry.use() as donut:
+                donut_result = donut.extract_receipt_from_pil(img, profile=profile)
             
             total_str = donut_result.get("total_amount", "0")
             vendor = donut_result.get("store_name", "Unknown")
@@ -453,7 +875,10 @@ class ReceiptScanner:
                 "raw_text": json.dumps(donut_result.get("raw_result", {})),
                 "items": donut_result.get("items", []),
                 "date": donut_result.get("date", "Unknown"),
-                "method": "donut+ocr" if EASYOCR_AVAILABLE else "donut"
+                "confidence": donut_result.get("confidence"),
+                "decoding": donut_result.get("decoding"),
+                "method": "donut+ocr" if EASYOCR_AVAILABLE else "donut",
+                "preprocess_profile": profile
             }
         except Exception as e:
             logger.error(f"Receipt scanning failed: {e}")
@@ -478,14 +903,13 @@ class ReceiptScanner:
         Fallback extraction using EasyOCR for better accuracy
         """
         try:
-            # Initialize EasyOCR reader (supports English and Hindi for Indian receipts)
-            reader = easyocr.Reader(['en', 'hi'], gpu=torch.cuda.is_available())
-            
             # Convert PIL to numpy array
             img_array = np.array(img)
             
-            # Perform OCR
-            results = reader.readtext(img_array)
+            # Perform OCR with a pooled reader instead of loading weights per call
+            key = (EASYOCR_LANGUAGES, torch.cuda.is_available())
+            with easyocr_pool.checkout(key) as reader:
+                results = reader.readtext(img_array)
             
             # Extract text
             all_text = [text for (bbox, text, prob) in results]
@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFullError(Exception):
+    """Raised when no more scan jobs can be queued (maps to HTTP 429)"""
+
+
+class ScanJobManager:
+    """In-process queue of receipt-scan jobs served by a fixed worker pool.
+
+    submit() returns immediately with a job id; `workers` asyncio tasks
+    pull jobs and await handler(payload), so at most that many scans are in
+    flight at once. A handler result with success=False (an ApiResponse
+    dict) marks the job failed, with the result kept for details. Finished jobs are kept for ttl_seconds so clients can
+    poll for the result, then dropped.
+
+    Queued payloads stay in memory until a worker takes them, so the queue
+    is bounded both by job count (max_queue) and by the payload sizes
+    passed to submit() (max_queued_bytes).
+
+    If on_update is given it is called with a copy of the job after every
+    status change (on one background thread, in order), so the record can
+    be published to storage other worker processes read from. submit()
+    waits for the first of these calls, so the job id it hands out can be
+    polled on any worker straight away.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Dict], Awaitable[Dict]],
+        workers: int = 2,
+        max_queue: int = 100,
+        max_queued_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: float = 3600.0,
+        on_update: Optional[Callable[[Dict], None]] = None,
+    ):
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self.max_queued_bytes = max_queued_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self.jobs: Dict[str, Dict] = {}
+        self._payloads: Dict[str, Dict] = {}
+        # Bytes held by queued payloads, job id -> size
+        self._payload_sizes: Dict[str, int] = {}
+        self._queued_bytes = 0
+        self._expires: Dict[str, float] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self.on_update = on_update
+        self._publisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scan-job-publish") \
+            if on_update else None
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [
+            asyncio.create_task(self._worker(i)) for i in range(self.workers)
+        ]
+        logger.info(f"Scan job workers started: {self.workers}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, payload: Dict, size: int = 0) -> Dict:
+        """Register and queue a scan, and return its job record
+
+        size is the memory the payload holds (the upload bytes), counted
+        against max_queued_bytes until a worker takes the job.
+        """
+        self._prune()
+        if self._queue is None:
+            raise RuntimeError("Scan job workers are not running")
+        if self._queue.full():
+            raise JobQueueFullError(f"Scan job queue full ({self.max_queue})")
+        # One job is always accepted when nothing is queued, whatever its size
+        if self._queued_bytes and self._queued_bytes + size > self.max_queued_bytes:
+            raise JobQueueFullError(f"Scan job queue full ({self._queued_bytes // 1024} KB queued)")
+
+        job_id = uuid.uuid4().hex
+        # Reserved before awaiting registration, so concurrent submits see it
+        self._payload_sizes[job_id] = size
+        self._queued_bytes += size
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "created_at": datetime.now().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None
+        }
+        # Registered before it is queued, so a worker never starts an unpublished job
+        if self._publisher is not None:
+            try:
+                await asyncio.wrap_future(self._publisher.submit(self.on_update, dict(job)))
+            except Exception as e:
+                self._release(job_id)
+                raise RuntimeError(f"Could not register scan job: {e}")
+
+        try:
+            self._queue.put_nowait(job_id)
+        except asyncio.QueueFull:
+            # Filled up by other submits while registering
+            self._release(job_id)
+            job["status"] = "failed"
+            job["error"] = "Scan job queue full"
+            job["finished_at"] = datetime.now().isoformat()
+            self._publish(job)
+            raise JobQueueFullError(f"Scan job queue full ({self.max_queue})")
+
+        self.jobs[job_id] = job
+        self._payloads[job_id] = payload
+        # A worker may pick it up before the caller reads it
+        return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        self._prune()
+        return self.jobs.get(job_id)
+
+    def stats(self) -> Dict:
+        counts = {}
+        for job in self.jobs.values():
+            counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "max_queue": self.max_queue,
+            "queued_bytes": self._queued_bytes,
+            "max_queued_bytes": self.max_queued_bytes,
+            "jobs": counts,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+    async def _worker(self, index: int):
+        while True:
+            job_id = await self._queue.get()
+            job = self.jobs.get(job_id)
+            payload = self._payloads.pop(job_id, None)
+            self._release(job_id)
+            if job is None or payload is None:
+                continue
+
+            job["status"] = "running"
+            job["started_at"] = datetime.now().isoformat()
+            self._publish(job)
+            try:
+                result = await self.handler(payload)
+                job["result"] = result
+                if isinstance(result, dict) and result.get("success") is False:
+                    job["status"] = "failed"
+                    job["error"] = self._result_error(result)
+                else:
+                    job["status"] = "succeeded"
+            except asyncio.CancelledError:
+                job["status"] = "failed"
+                job["error"] = "Cancelled"
+                raise
+            except Exception as e:
+                logger.error(f"Scan job {job_id} failed: {e}")
+                job["status"] = "failed"
+                job["error"] = str(e) or type(e).__name__
+            finally:
+                job["finished_at"] = datetime.now().isoformat()
+                self._expires[job_id] = time.monotonic() + self.ttl_seconds
+                self._publish(job)
+
+    def _release(self, job_id: str):
+        self._queued_bytes -= self._payload_sizes.pop(job_id, 0)
+
+    @staticmethod
+    def _result_error(result: Dict) -> str:
+        message = result.get("message") or "Scan failed"
+        detail = (result.get("data") or {}).get("error")
+        return f"{message} ({detail})" if detail else message
+
+    def _publish(self, job: Dict):
+        if self._publisher is None:
+            return
+        future = self._publisher.submit(self.on_update, dict(job))
+        future.add_done_callback(self._log_publish_error)
+
+    @staticmethod
+    def _log_publish_error(future):
+        if future.exception() is not None:
+            logger.warning(f"Publishing scan job state failed: {future.exception()}")
+
+    def _prune(self):
+        now = time.monotonic()
+        expired = [job_id for job_id, at in self._expires.items() if at <= now]
+        for job_id in expired:
+            del self._expires[job_id]
+            self.jobs.pop(job_id, None)
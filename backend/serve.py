@@ -0,0 +1,182 @@
+"""
+Production launcher: N uvicorn workers forked from one preloaded parent.
+
+The parent loads the Donut and MiniLM weights once, binds the listening
+socket and forks the workers, which inherit both. Model pages are shared
+copy-on-write instead of each worker holding its own copy (the category
+embeddings are additionally memory-mapped from the on-disk cache). The
+parent then only supervises: a worker that dies is started again, and
+SIGTERM/SIGINT are forwarded for a graceful shutdown.
+
+State is shared through the SQLite repository, so more than one worker
+requires STORAGE_BACKEND=sqlite.
+
+Usage: python serve.py [--workers 4] [--host 0.0.0.0] [--port 8000]
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("serve")
+
+# A worker that exits sooner than this after starting is restarted with a delay
+MIN_WORKER_UPTIME_SECONDS = 5.0
+
+
+def _bind_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    # Accepted sockets copy proto; asyncio only sets TCP_NODELAY when it is IPPROTO_TCP
+    sock = socket.socket(family, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _limit_torch_threads(threads: int):
+    """Set torch's intra-op threads if torch is already loaded"""
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(threads)
+
+
+def _preload_models(main):
+    """Load shared models in the parent so forked workers inherit them"""
+    import receipt_scanner
+
+    preload_donut = main.WARM_UP_MODELS and main.INFERENCE_MODE == "thread"
+    if not (preload_donut or main.expense_categorizer.use_llm):
+        return
+
+    # torch is imported lazily; bring it in now so its thread count is set before
+    # any model loads. One thread: an OpenMP pool started in the parent does not survive fork
+    receipt_scanner.load_ocr_dependencies()
+    _limit_torch_threads(1)
+
+    if main.expense_categorizer.use_llm:
+        main.expense_categorizer.load()
+    if preload_donut:
+        receipt_scanner.donut_registry.warm_up()
+        receipt_scanner.warm_up_easyocr()
+
+
+def _run_worker(main, sock: socket.socket, index: int, workers: int, args):
+    """Body of a forked worker; never returns"""
+    import ids
+    import receipt_scanner
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    # Distinct worker ids keep generated ids unique across the workers
+    base = int(os.getenv("WORKER_ID", "0"))
+    ids.generator.reset((base + index) & 0xFFFF)
+
+    receipt_scanner.donut_registry.after_fork()
+    # TORCH_INTRA_OP_THREADS overrides the even split of cores between workers
+    _limit_torch_threads(receipt_scanner.TORCH_INTRA_OP_THREADS or max(1, (os.cpu_count() or 1) // workers))
+
+    config = uvicorn.Config(main.app, log_level=args.log_level, access_log=args.access_log)
+    server = uvicorn.Server(config)
+    code = 0
+    try:
+        server.run(sockets=[sock])
+    except BaseException:
+        logger.exception(f"Worker {index} crashed")
+        code = 1
+    finally:
+        os._exit(code)
+
+
+def _supervise(main, sock: socket.socket, args):
+    children = {}  # pid -> (worker index, start time)
+    stopping = False
+
+    def spawn(index: int):
+        pid = os.fork()
+        if pid == 0:
+            _run_worker(main, sock, index, args.workers, args)
+        children[pid] = (index, time.monotonic())
+        logger.info(f"Worker {index} started (pid {pid})")
+
+    def stop(signum, frame):
+        nonlocal stopping
+        if stopping:
+            return
+        stopping = True
+        logger.info(f"Stopping {len(children)} workers")
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for index in range(args.workers):
+        spawn(index)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        if pid not in children:
+            continue
+        index, started = children.pop(pid)
+        if stopping:
+            continue
+
+        logger.warning(f"Worker {index} (pid {pid}) exited with status {status}, restarting")
+        if time.monotonic() - started < MIN_WORKER_UPTIME_SECONDS:
+            time.sleep(1.0)
+        if not stopping:
+            spawn(index)
+
+    sock.close()
+    main.repository.close()
+    logger.info("All workers stopped")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_WORKERS", "1")))
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info"))
+    parser.add_argument("--no-access-log", dest="access_log", action="store_false")
+    parser.add_argument("--no-preload", dest="preload", action="store_false",
+                        help="Let each worker load its own models at startup")
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        if os.getenv("STORAGE_BACKEND", "sqlite") != "sqlite":
+            parser.error("more than one worker needs STORAGE_BACKEND=sqlite")
+        if not hasattr(os, "fork"):
+            parser.error("multiple workers need os.fork (Linux/macOS)")
+
+    import main
+
+    if args.workers == 1:
+        uvicorn.run(main.app, host=args.host, port=args.port,
+                    log_level=args.log_level, access_log=args.access_log)
+        return
+
+    if args.preload:
+        _preload_models(main)
+    sock = _bind_socket(args.host, args.port)
+    logger.info(f"Serving on {args.host}:{args.port} with {args.workers} workers")
+    _supervise(main, sock, args)
+
+
+if __name__ == "__main__":
+    main_cli()
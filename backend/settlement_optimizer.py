@@ -1,45 +1,168 @@
-from typing import Dict, List, Any
+import time
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+# Engines accepted by SettlementOptimizer.settle_balances
+SETTLEMENT_ENGINES = ("greedy", "exact")
+
+# Above this many unmatched balances the exact engine uses branch-and-bound
+EXACT_DP_MAX_USERS = 14
+
+# From this many expenses calculate_balances switches to the NumPy path. It
+# is about 2x faster, not more: 9.7 ms vs 18.3 ms at 5000 expenses, 170 ms
+# vs 373 ms at 100k (benchmarks/balance_paths.py). Below this both take a
+# few ms, so the scalar reference path is kept there; tests/test_balance_paths.py
+# checks both paths agree to the cent on either side of the threshold
+VECTORIZE_MIN_EXPENSES = 5000
+
+
+class _BudgetExceeded(Exception):
+    pass
+
+
+def to_cents(amount: float) -> int:
+    """Convert an API amount (rupees as float) to integer minor units"""
+    return int(round(amount * 100))
+
+
+def from_cents(cents: int) -> float:
+    """Convert integer minor units back to a float for API responses"""
+    return cents / 100
+
 
 class SettlementOptimizer:
+    """Settlement computation in integer minor units (cents/paise).
+
+    Expense amounts come in as floats and are converted once with to_cents;
+    balances and settlement amounts stay integers until the API layer
+    converts them back with from_cents.
+    """
+
+    @staticmethod
+    def calculate_balances(expenses) -> Dict[str, int]:
+        """Calculate net balance (in cents) for each user"""
+        if len(expenses) >= VECTORIZE_MIN_EXPENSES:
+            return SettlementOptimizer.calculate_balances_vectorized(expenses)
+        return SettlementOptimizer.calculate_balances_scalar(expenses)
+
     @staticmethod
-    def calculate_balances(expenses):
-        """Calculate net balance for each user"""
+    def calculate_balances_scalar(expenses) -> Dict[str, int]:
+        """Reference path: apply expenses one at a time"""
         balances = {}
         
+        for expense in expenses:
+            SettlementOptimizer.apply_expense(
+                balances,
+                expense.get("paid_by"),
+                to_cents(expense.get("amount", 0)),
+                expense.get("split_between", [])
+            )
+        
+        return balances
+
+    @staticmethod
+    def calculate_balances_vectorized(expenses) -> Dict[str, int]:
+        """Columnar path for long histories, same result as the scalar path.
+
+        User ids are interned to indices in sorted order and the splits laid
+        out in CSR form (indptr/indices), so credits, equal shares and the
+        sorted-order remainder cents are each one NumPy pass. Those passes
+        are cheap; reading the expense dicts and interning every participant
+        is not, which keeps this path at roughly half the scalar time
+        (about 2 us per expense, see benchmarks/balance_paths.py). Settlement
+        itself reads BalanceLedger and does not replay history at all.
+        """
+        payers, amounts, counts, split_users = [], [], [], []
         for expense in expenses:
             payer = expense.get("paid_by")
-            amount = expense.get("amount", 0)
             split_between = expense.get("split_between", [])
-            
-            if not payer or not split_between or amount <= 0:
+            if not payer or not split_between:
                 continue
-            
-            split_count = len(split_between)
-            share = round(amount / split_count, 2) if split_count > 0 else 0
-            
-            # Payer receives money back (paid more than their share)
-            balances[payer] = balances.get(payer, 0.0) + amount - share
-            
-            # Others owe their share
-            for user_id in split_between:
-                if user_id != payer:
-                    balances[user_id] = balances.get(user_id, 0.0) - share
+            payers.append(payer)
+            amounts.append(expense.get("amount", 0))
+            counts.append(len(split_between))
+            split_users.extend(split_between)
         
-        return balances
+        if not payers:
+            return {}
+        
+        # Interning in sorted order makes index order match sorted() on the ids
+        user_ids = sorted(set(payers).union(split_users))
+        position = {uid: i for i, uid in enumerate(user_ids)}
+        payer_idx = np.fromiter(map(position.__getitem__, payers), np.int64, len(payers))
+        indices = np.fromiter(map(position.__getitem__, split_users), np.int64, len(split_users))
+        counts = np.array(counts, dtype=np.int64)
+        
+        # Same rounding as to_cents: np.rint and round() both round half to even
+        amounts = np.rint(np.array(amounts, dtype=np.float64) * 100).astype(np.int64)
+        entry_expense = np.repeat(np.arange(len(counts)), counts)
+        
+        # Drop expenses that round to nothing, as apply_expense does
+        valid = amounts > 0
+        if not valid.all():
+            entry_valid = valid[entry_expense]
+            payer_idx, amounts, counts = payer_idx[valid], amounts[valid], counts[valid]
+            indices = indices[entry_valid]
+            entry_expense = np.repeat(np.arange(len(counts)), counts)
+        
+        indptr = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        
+        balances = np.zeros(len(user_ids), dtype=np.int64)
+        np.add.at(balances, payer_idx, amounts)
+        
+        share, remainder = np.divmod(amounts, counts)
+        
+        # Rank of each participant within its expense by user id gets the leftover cents;
+        # entries are already grouped by expense, so a stable sort only reorders within runs
+        order = np.argsort(entry_expense * len(user_ids) + indices, kind="stable")
+        sorted_expense = entry_expense[order]
+        rank = np.arange(len(order)) - indptr[sorted_expense]
+        owed = share[sorted_expense] + (rank < remainder[sorted_expense])
+        np.add.at(balances, indices[order], -owed)
+        
+        touched = np.zeros(len(user_ids), dtype=bool)
+        touched[payer_idx] = True
+        touched[indices] = True
+        return {user_ids[i]: int(balances[i]) for i in np.flatnonzero(touched)}
 
     @staticmethod
-    def minimize_transactions(balances):
+    def apply_expense(balances, payer, amount_cents: int, split_between):
+        """Add one expense (in cents) to a balances dict in place, O(split size).
+
+        The amount is split into equal integer shares; the leftover cents go
+        one each to the first participants in sorted id order, so every
+        expense nets to exactly zero and the result never depends on the
+        order ids were submitted in.
+        """
+        if not payer or not split_between or amount_cents <= 0:
+            return
+        
+        share, remainder = divmod(amount_cents, len(split_between))
+        
+        # Payer is owed the full amount; their own share is subtracted below
+        balances[payer] = balances.get(payer, 0) + amount_cents
+        
+        if remainder:
+            split_between = sorted(split_between)
+        for index, user_id in enumerate(split_between):
+            owed = share + 1 if index < remainder else share
+            balances[user_id] = balances.get(user_id, 0) - owed
+
+    @staticmethod
+    def minimize_transactions(balances) -> List[Dict]:
         """Optimize settlements using greedy algorithm to minimize transactions"""
-        # Filter out near-zero balances
-        creditors = [(uid, round(bal, 2)) for uid, bal in balances.items() if bal > 0.01]
-        debtors = [(uid, round(-bal, 2)) for uid, bal in balances.items() if bal < -0.01]
+        creditors = [(uid, bal) for uid, bal in balances.items() if bal > 0]
+        debtors = [(uid, -bal) for uid, bal in balances.items() if bal < 0]
         
         if not creditors or not debtors:
             return []
         
-        # Sort by amount (largest first) for optimal matching
-        creditors.sort(key=lambda x: x[1], reverse=True)
-        debtors.sort(key=lambda x: x[1], reverse=True)
+        # Sort by amount (largest first) for optimal matching; ties by id so the
+        # result does not depend on the order balances were accumulated in
+        creditors.sort(key=lambda x: (-x[1], x[0]))
+        debtors.sort(key=lambda x: (-x[1], x[0]))
         
         settlements = []
         i = j = 0
@@ -50,33 +173,252 @@ class SettlementOptimizer:
             
             # Settle the minimum of what's owed/owed to
             settle_amt = min(cred_amt, deb_amt)
-            
-            if settle_amt > 0.01:  # Only add if meaningful amount
-                settlements.append({
-                    "from": debtor_id,
-                    "to": creditor_id,
-                    "amount": round(settle_amt, 2)
-                })
+            settlements.append({
+                "from": debtor_id,
+                "to": creditor_id,
+                "amount_cents": settle_amt
+            })
             
             # Update remaining balances
-            creditors[i] = (creditor_id, round(cred_amt - settle_amt, 2))
-            debtors[j] = (debtor_id, round(deb_amt - settle_amt, 2))
+            creditors[i] = (creditor_id, cred_amt - settle_amt)
+            debtors[j] = (debtor_id, deb_amt - settle_amt)
             
             # Move to next if settled
-            if creditors[i][1] < 0.01:
+            if creditors[i][1] == 0:
                 i += 1
-            if debtors[j][1] < 0.01:
+            if debtors[j][1] == 0:
                 j += 1
         
         return settlements
 
     @staticmethod
-    def optimize_settlements(expenses):
-        """Main method to calculate optimal settlements"""
+    def minimize_transactions_exact(balances, time_budget_ms: float = 200.0) -> Optional[List[Dict]]:
+        """Minimum-transaction settlement via zero-sum subset decomposition.
+
+        Splits the balances into as many zero-sum subsets as possible (each
+        then settles with n-1 transfers), using bitmask DP for small groups
+        and branch-and-bound above EXACT_DP_MAX_USERS. Returns None if the
+        time budget runs out so the caller can fall back to greedy.
+        """
+        cents = {uid: bal for uid, bal in balances.items() if bal != 0}
+        if sum(cents.values()) != 0:
+            return None
+        deadline = time.perf_counter() + time_budget_ms / 1000
+        
+        try:
+            groups = SettlementOptimizer._zero_sum_groups(cents, deadline)
+        except _BudgetExceeded:
+            return None
+        
+        settlements = []
+        for group in groups:
+            # Greedy inside a zero-sum subset needs at most len(group) - 1 transfers
+            subset = {uid: cents[uid] for uid in group}
+            settlements.extend(SettlementOptimizer.minimize_transactions(subset))
+        return settlements
+
+    @staticmethod
+    def _zero_sum_groups(cents: Dict[str, int], deadline: float) -> List[List[str]]:
+        groups = []
+        
+        # An exact opposite pair is part of some optimal partition, take those first
+        unmatched: Dict[int, List[str]] = {}
+        for uid in sorted(cents):
+            amount = cents[uid]
+            partners = unmatched.get(-amount)
+            if partners:
+                groups.append([partners.pop(), uid])
+            else:
+                unmatched.setdefault(amount, []).append(uid)
+        
+        items = [(uid, amount) for amount, uids in unmatched.items() for uid in uids]
+        if not items:
+            return groups
+        
+        if len(items) <= EXACT_DP_MAX_USERS:
+            index_groups = SettlementOptimizer._partition_dp([a for _, a in items], deadline)
+        else:
+            index_groups = SettlementOptimizer._partition_branch_and_bound(
+                [a for _, a in items], deadline
+            )
+        
+        groups.extend([[items[i][0] for i in group] for group in index_groups])
+        return groups
+
+    @staticmethod
+    def _partition_dp(amounts: List[int], deadline: float) -> List[List[int]]:
+        """Bitmask DP: dp[mask] = most zero-sum groups the users in mask split into"""
+        n = len(amounts)
+        size = 1 << n
+        sums = [0] * size
+        dp = [0] * size
+        
+        for mask in range(1, size):
+            if mask & 1023 == 0 and time.perf_counter() > deadline:
+                raise _BudgetExceeded()
+            
+            low = mask & -mask
+            sums[mask] = sums[mask ^ low] + amounts[low.bit_length() - 1]
+            
+            best = 0
+            rest = mask
+            while rest:
+                bit = rest & -rest
+                if dp[mask ^ bit] > best:
+                    best = dp[mask ^ bit]
+                rest ^= bit
+            dp[mask] = best + (sums[mask] == 0)
+        
+        # Walk back from the full set; every zero-sum mask on the path closes a group
+        groups = []
+        mask = boundary = size - 1
+        while mask:
+            target = dp[mask] - (sums[mask] == 0)
+            rest = mask
+            while rest:
+                bit = rest & -rest
+                if dp[mask ^ bit] == target:
+                    break
+                rest ^= bit
+            mask ^= bit
+            if sums[mask] == 0:
+                diff = boundary ^ mask
+                groups.append([i for i in range(n) if diff >> i & 1])
+                boundary = mask
+        return groups
+
+    @staticmethod
+    def _partition_branch_and_bound(amounts: List[int], deadline: float) -> List[List[int]]:
+        """Search partitions into zero-sum subsets, smallest subsets first, pruning on an upper bound"""
+        order = sorted(range(len(amounts)), key=lambda i: -abs(amounts[i]))
+        best: List[List[List[int]]] = [[order]]
+        
+        def subsets_of_size(first: int, others: List[int], size: int):
+            """Zero-sum subsets of exactly `size` users that contain `first`"""
+            # Suffix sums of positive/negative amounts bound what the rest can reach
+            pos_left = [0] * (len(others) + 1)
+            neg_left = [0] * (len(others) + 1)
+            for k in range(len(others) - 1, -1, -1):
+                amount = amounts[others[k]]
+                pos_left[k] = pos_left[k + 1] + max(amount, 0)
+                neg_left[k] = neg_left[k + 1] + min(amount, 0)
+            
+            chosen = [first]
+            
+            def extend(k: int, total: int):
+                if time.perf_counter() > deadline:
+                    raise _BudgetExceeded()
+                if len(chosen) == size - 1:
+                    for j in range(k, len(others)):
+                        if amounts[others[j]] == -total:
+                            yield tuple(chosen) + (others[j],)
+                    return
+                for j in range(k, len(others)):
+                    new_total = total + amounts[others[j]]
+                    # A zero prefix would make the subset non-minimal
+                    if new_total == 0 or not neg_left[j + 1] <= -new_total <= pos_left[j + 1]:
+                        continue
+                    chosen.append(others[j])
+                    yield from extend(j + 1, new_total)
+                    chosen.pop()
+            
+            yield from extend(0, amounts[first])
+        
+        def search(remaining: List[int], groups: List[List[int]]):
+            if not remaining:
+                if len(groups) > len(best[0]):
+                    best[0] = [list(g) for g in groups]
+                return
+            
+            positives = sum(1 for i in remaining if amounts[i] > 0)
+            if len(groups) + min(positives, len(remaining) - positives) <= len(best[0]):
+                return
+            
+            first, others = remaining[0], remaining[1:]
+            for size in range(2, len(remaining) + 1):
+                # Every later group needs at least two users
+                if len(groups) + 1 + (len(remaining) - size) // 2 <= len(best[0]):
+                    break
+                for subset in subsets_of_size(first, others, size):
+                    taken = set(subset)
+                    groups.append(list(subset))
+                    search([i for i in others if i not in taken], groups)
+                    groups.pop()
+        
+        search(order, [])
+        return best[0]
+
+    @staticmethod
+    def optimize_settlements(expenses, engine: str = "greedy"):
+        """Main method to calculate optimal settlements (amounts in cents)"""
         balances = SettlementOptimizer.calculate_balances(expenses)
-        settlements = SettlementOptimizer.minimize_transactions(balances)
+        return SettlementOptimizer.settle_balances(balances, engine)
+
+    @staticmethod
+    def settle_balances(balances, engine: str = "greedy", time_budget_ms: float = 200.0):
+        """Calculate optimal settlements from already-known net balances in cents"""
+        if engine not in SETTLEMENT_ENGINES:
+            raise ValueError(f"Unknown settlement engine: {engine}")
+        
+        settlements = None
+        engine_used = engine
+        if engine == "exact":
+            settlements = SettlementOptimizer.minimize_transactions_exact(balances, time_budget_ms)
+            if settlements is None:
+                engine_used = "greedy_fallback"
+        if settlements is None:
+            settlements = SettlementOptimizer.minimize_transactions(balances)
         
         return {
             "balances": balances,
-            "optimal_settlements": settlements
-        }
\ No newline at end of file
+            "optimal_settlements": settlements,
+            "engine": engine_used
+        }
+
+
+class BalanceLedger:
+    """Running net balance per group in cents, updated as each expense is stored.
+
+    Settlement reads balances from here instead of replaying the group's
+    whole expense history; verify() replays it anyway to check for drift.
+    """
+
+    def __init__(self):
+        self._groups: Dict[str, Dict[str, int]] = {}
+
+    def record(self, group_id: str, payer: str, amount: float, split_between: List[str]):
+        balances = self._groups.setdefault(group_id, {})
+        SettlementOptimizer.apply_expense(balances, payer, to_cents(amount), split_between)
+
+    def record_many(self, group_id: str, expenses: List[Dict]):
+        """Apply a batch (settlement-view dicts) with one balance computation and one merge"""
+        balances = self._groups.setdefault(group_id, {})
+        for user_id, delta in SettlementOptimizer.calculate_balances(expenses).items():
+            balances[user_id] = balances.get(user_id, 0) + delta
+
+    def balances(self, group_id: str) -> Dict[str, int]:
+        return dict(self._groups.get(group_id, {}))
+
+    def reset(self, group_id: str, balances: Dict[str, int]):
+        self._groups[group_id] = dict(balances)
+
+    def verify(self, group_id: str, expenses: List[Dict]) -> Dict:
+        """Compare the ledger with a full recompute from expenses"""
+        return BalanceLedger.compare(self._groups.get(group_id, {}), expenses)
+
+    @staticmethod
+    def compare(ledger: Dict[str, int], expenses: List[Dict]) -> Dict:
+        """Compare stored balances (in cents) with a full recompute from expenses"""
+        recomputed = SettlementOptimizer.calculate_balances(expenses)
+        
+        mismatched = {}
+        for user_id in set(ledger) | set(recomputed):
+            drift = ledger.get(user_id, 0) - recomputed.get(user_id, 0)
+            if drift:
+                mismatched[user_id] = drift
+        
+        return {
+            "consistent": not mismatched,
+            "mismatched": mismatched,
+            "recomputed_balances": recomputed
+        }
@@ -0,0 +1,634 @@
+import bisect
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from settlement_optimizer import BalanceLedger, SettlementOptimizer
+
+logger = logging.getLogger(__name__)
+
+# Backends accepted by create_repository / STORAGE_BACKEND
+STORAGE_BACKENDS = ("sqlite", "memory")
+
+
+def settlement_view(expense: Dict) -> Dict:
+    """Adapt a stored expense to the settlement optimizer's format"""
+    return {
+        "paid_by": expense["paid_by_user_id"],
+        "amount": expense["amount"],
+        "split_between": expense["split_among_user_ids"]
+    }
+
+
+class ExpenseStore:
+    """In-memory expense storage indexed by group.
+
+    Alongside the id -> expense map it keeps, per group, the expense ids in
+    id order and running category totals, both updated on insert. Ids are
+    time-ordered (see ids.py), so id order is creation order; an id made
+    just before a concurrent one but stored after it is inserted at its
+    place, keeping cursors (which are ids) consistent. Reading one group's
+    expenses therefore touches only that group's rows and never needs a sort.
+    """
+
+    def __init__(self):
+        self._expenses: Dict[str, Dict] = {}
+        self._group_index: Dict[str, List[str]] = {}
+        self._category_totals: Dict[str, Dict[str, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._expenses)
+
+    def __contains__(self, expense_id: str) -> bool:
+        return expense_id in self._expenses
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._expenses)
+
+    def add(self, expense: Dict):
+        """Store an expense at its place in its group's id order"""
+        expense_id = expense["id"]
+        if expense_id in self._expenses:
+            raise KeyError(f"Expense {expense_id} already exists")
+
+        group_id = expense["group_id"]
+        self._expenses[expense_id] = expense
+        group_ids = self._group_index.setdefault(group_id, [])
+        if not group_ids or group_ids[-1] < expense_id:
+            group_ids.append(expense_id)
+        else:
+            # Its id was generated before one already stored
+            bisect.insort(group_ids, expense_id)
+
+        totals = self._category_totals.setdefault(group_id, {})
+        category = expense["category"]
+        totals[category] = totals.get(category, 0) + expense["amount"]
+
+    def add_many(self, expenses: List[Dict]):
+        """Store a batch; nothing is stored if any id is taken"""
+        ids = [expense["id"] for expense in expenses]
+        if len(set(ids)) != len(ids) or any(expense_id in self._expenses for expense_id in ids):
+            raise KeyError("Batch contains an existing or duplicate expense id")
+
+        for expense in expenses:
+            self.add(expense)
+
+    def get(self, expense_id: str) -> Optional[Dict]:
+        return self._expenses.get(expense_id)
+
+    def values(self) -> Iterator[Dict]:
+        return iter(self._expenses.values())
+
+    def group_expenses(self, group_id: str, newest_first: bool = False) -> List[Dict]:
+        """Expenses of one group in id (creation) order, or reversed"""
+        ids = self._group_index.get(group_id, [])
+        if newest_first:
+            ids = reversed(ids)
+        return [self._expenses[expense_id] for expense_id in ids]
+
+    def iter_group_expenses(self, group_id: str, newest_first: bool = False) -> Iterator[Dict]:
+        """Lazily yield one group's expenses; rows added meanwhile are not included"""
+        # A copy, as a late id can be inserted mid-list while this is consumed
+        ids = list(self._group_index.get(group_id, []))
+        positions = range(len(ids) - 1, -1, -1) if newest_first else range(len(ids))
+        for position in positions:
+            yield self._expenses[ids[position]]
+
+    def group_page(self, group_id: str, limit: int, after_id: Optional[str] = None,
+                   newest_first: bool = True) -> Tuple[List[Dict], Optional[str]]:
+        """One page of a group's expenses following after_id.
+
+        Returns (expenses, id of the last one returned or None when no more
+        remain). Only the page itself is touched, whatever the group size.
+        """
+        ids = self._group_index.get(group_id, [])
+        if after_id is None:
+            start = len(ids) - 1 if newest_first else 0
+        else:
+            position = bisect.bisect_left(ids, after_id)
+            if position == len(ids) or ids[position] != after_id:
+                raise KeyError(f"Expense {after_id} not in group {group_id}")
+            start = position - 1 if newest_first else position + 1
+
+        if newest_first:
+            page_ids = ids[max(start - limit + 1, 0):start + 1][::-1] if start >= 0 else []
+            more = start - limit >= 0
+        else:
+            page_ids = ids[start:start + limit]
+            more = start + limit < len(ids)
+
+        page = [self._expenses[expense_id] for expense_id in page_ids]
+        return page, (page_ids[-1] if more and page_ids else None)
+
+    def group_count(self, group_id: str) -> int:
+        return len(self._group_index.get(group_id, []))
+
+    def category_totals(self, group_id: str) -> Dict[str, float]:
+        return dict(self._category_totals.get(group_id, {}))
+
+
+class MemoryRepository:
+    """Groups, users, expenses and balances held in process memory.
+
+    Nothing survives a restart and state is not shared between workers;
+    meant for tests and single-process development.
+    """
+
+    backend = "memory"
+
+    def __init__(self):
+        self._groups: Dict[str, Dict] = {}
+        self._users: Dict[str, Dict] = {}
+        self._expenses = ExpenseStore()
+        self._ledger = BalanceLedger()
+        self._jobs: Dict[str, Tuple[Dict, float]] = {}
+        self._write_lock = threading.Lock()
+
+    def close(self):
+        pass
+
+    def stats(self) -> Dict:
+        return {"backend": self.backend, "groups": len(self._groups), "expenses": len(self._expenses)}
+
+    # Groups and users
+
+    def create_group(self, group: Dict):
+        """Store a group record and any of its members not seen before"""
+        with self._write_lock:
+            if group["id"] in self._groups:
+                raise KeyError(f"Group {group['id']} already exists")
+            for member in group["members"]:
+                self._users.setdefault(member["id"], dict(member))
+            self._groups[group["id"]] = dict(group)
+
+    def get_group(self, group_id: str) -> Optional[Dict]:
+        group = self._groups.get(group_id)
+        return dict(group) if group else None
+
+    def has_group(self, group_id: str) -> bool:
+        return group_id in self._groups
+
+    def existing_groups(self, group_ids: Iterable[str]) -> set:
+        return {group_id for group_id in group_ids if group_id in self._groups}
+
+    # Expenses
+
+    def add_expenses(self, expenses: List[Dict]):
+        """Store a batch with its group totals, category totals and balances"""
+        by_group = _by_group(expenses)
+        with self._write_lock:
+            # Checked before anything is written, so a bad batch leaves no trace
+            missing = [group_id for group_id in by_group if group_id not in self._groups]
+            if missing:
+                raise KeyError(f"Group {missing[0]} not found")
+            self._expenses.add_many(expenses)
+            for group_id, group_expenses in by_group.items():
+                self._ledger.record_many(group_id, [settlement_view(e) for e in group_expenses])
+                group = self._groups[group_id]
+                group["total_expenses"] += len(group_expenses)
+                group["total_amount"] += sum(e["amount"] for e in group_expenses)
+
+    def get_expense(self, expense_id: str) -> Optional[Dict]:
+        return self._expenses.get(expense_id)
+
+    def group_expenses(self, group_id: str, newest_first: bool = False) -> List[Dict]:
+        return self._expenses.group_expenses(group_id, newest_first)
+
+    def iter_group_expenses(self, group_id: str, newest_first: bool = False) -> Iterator[Dict]:
+        return self._expenses.iter_group_expenses(group_id, newest_first)
+
+    def group_page(self, group_id: str, limit: int, after_id: Optional[str] = None,
+                   newest_first: bool = True) -> Tuple[List[Dict], Optional[str]]:
+        return self._expenses.group_page(group_id, limit, after_id, newest_first)
+
+    def group_count(self, group_id: str) -> int:
+        return self._expenses.group_count(group_id)
+
+    def category_totals(self, group_id: str) -> Dict[str, float]:
+        return self._expenses.category_totals(group_id)
+
+    # Balances (integer cents)
+
+    def balances(self, group_id: str) -> Dict[str, int]:
+        return self._ledger.balances(group_id)
+
+    def reset_balances(self, group_id: str, balances: Dict[str, int]):
+        with self._write_lock:
+            self._ledger.reset(group_id, balances)
+
+    # Scan jobs
+
+    def save_job(self, job: Dict, ttl_seconds: float):
+        now = time.time()
+        with self._write_lock:
+            for job_id in [k for k, (_, expires_at) in self._jobs.items() if expires_at <= now]:
+                del self._jobs[job_id]
+            self._jobs[job["id"]] = (dict(job), now + ttl_seconds)
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        entry = self._jobs.get(job_id)
+        if entry is None or entry[1] <= time.time():
+            return None
+        return dict(entry[0])
+
+
+class SQLiteConnectionPool:
+    """Bounded pool of SQLite connections shared by the request threads.
+
+    Connections are created lazily up to `size`; checkout blocks once all
+    are in use. Each connection keeps its own compiled statement cache, so
+    the repository's constant SQL strings are prepared once per connection.
+    """
+
+    def __init__(self, path: str, size: int = 8, busy_timeout_ms: int = 5000):
+        self.path = path
+        self.size = size
+        self.busy_timeout_ms = busy_timeout_ms
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._all: List[sqlite3.Connection] = []
+        self._pid = os.getpid()
+
+    def _reset_after_fork(self):
+        # Connections opened before fork belong to the parent; drop them unclosed
+        self._idle = queue.LifoQueue()
+        self._all = []
+        self._created = 0
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=256
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL keeps NORMAL durable against application crashes and much faster than FULL
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        return conn
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = 30.0):
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if self._created < self.size:
+                    self._created += 1
+                    create = True
+                else:
+                    create = False
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+                with self._lock:
+                    self._all.append(conn)
+            else:
+                conn = self._idle.get(timeout=timeout)
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                # Never hand an open transaction to the next borrower
+                self._discard(conn)
+            else:
+                self._idle.put(conn)
+
+    def _discard(self, conn: sqlite3.Connection):
+        try:
+            conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Closing a discarded SQLite connection failed: {e}")
+        with self._lock:
+            if conn in self._all:
+                self._all.remove(conn)
+                self._created -= 1
+
+    def close(self):
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all.clear()
+            self._created = 0
+        self._idle = queue.LifoQueue()
+
+
+class SQLiteRepository:
+    """Durable repository on one SQLite database in WAL mode.
+
+    Readers run concurrently on pooled connections; writes are serialized
+    in-process and each call is one IMMEDIATE transaction, so a bulk import
+    commits once for the whole batch. Expense ids are time-ordered (see
+    ids.py), so the table is clustered on id and a group's (group_id, id)
+    index is already in creation order. Expenses are stored as JSON next to
+    the columns used for indexing and totals; group totals, category totals
+    and ledger balances are updated in the same transaction as the rows.
+    """
+
+    backend = "sqlite"
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS groups (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            total_expenses INTEGER NOT NULL DEFAULT 0,
+            total_amount REAL NOT NULL DEFAULT 0,
+            members TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS users (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            email TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS expenses (
+            id TEXT PRIMARY KEY,
+            group_id TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            amount REAL NOT NULL,
+            category TEXT NOT NULL,
+            data TEXT NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_expenses_group ON expenses (group_id, id);
+        CREATE TABLE IF NOT EXISTS category_totals (
+            group_id TEXT NOT NULL,
+            category TEXT NOT NULL,
+            amount REAL NOT NULL,
+            PRIMARY KEY (group_id, category)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS balances (
+            group_id TEXT NOT NULL,
+            user_id TEXT NOT NULL,
+            cents INTEGER NOT NULL,
+            PRIMARY KEY (group_id, user_id)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS scan_jobs (
+            id TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_scan_jobs_expires ON scan_jobs (expires_at);
+    """
+
+    # Rows fetched per query when streaming a whole group
+    STREAM_CHUNK = 500
+
+    def __init__(self, path: str, pool_size: int = 8):
+        self.path = path
+        self.pool = SQLiteConnectionPool(path, pool_size)
+        self._write_lock = threading.Lock()
+        with self.pool.connection() as conn:
+            conn.executescript(self.SCHEMA)
+        logger.info(f"SQLite storage at {path}")
+
+    def close(self):
+        self.pool.close()
+
+    def stats(self) -> Dict:
+        # No row counts: COUNT(*) scans the table and this backs the readiness probe
+        return {"backend": self.backend, "path": self.path, "pool_size": self.pool.size}
+
+    @contextmanager
+    def _transaction(self):
+        with self._write_lock, self.pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                # COMMIT itself can fail (e.g. SQLITE_BUSY) and leave the transaction open
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+
+    # Groups and users
+
+    def create_group(self, group: Dict):
+        with self._transaction() as conn:
+            try:
+                conn.execute(
+                    "INSERT INTO groups (id, name, created_at, total_expenses, total_amount, members) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (group["id"], group["name"], group["created_at"], group["total_expenses"],
+                     group["total_amount"], json.dumps(group["members"]))
+                )
+            except sqlite3.IntegrityError:
+                raise KeyError(f"Group {group['id']} already exists")
+            conn.executemany(
+                "INSERT OR IGNORE INTO users (id, name, email) VALUES (?, ?, ?)",
+                [(m["id"], m["name"], m["email"]) for m in group["members"]]
+            )
+
+    def get_group(self, group_id: str) -> Optional[Dict]:
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT id, name, members, created_at, total_expenses, total_amount FROM groups WHERE id = ?",
+                (group_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "name": row[1],
+            "members": json.loads(row[2]),
+            "created_at": row[3],
+            "total_expenses": row[4],
+            "total_amount": row[5]
+        }
+
+    def has_group(self, group_id: str) -> bool:
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT 1 FROM groups WHERE id = ?", (group_id,)).fetchone() is not None
+
+    def existing_groups(self, group_ids: Iterable[str]) -> set:
+        group_ids = list(set(group_ids))
+        found = set()
+        with self.pool.connection() as conn:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(group_ids), 500):
+                chunk = group_ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(row[0] for row in conn.execute(
+                    f"SELECT id FROM groups WHERE id IN ({placeholders})", chunk
+                ))
+        return found
+
+    # Expenses
+
+    def add_expenses(self, expenses: List[Dict]):
+        with self._transaction() as conn:
+            try:
+                conn.executemany(
+                    "INSERT INTO expenses (id, group_id, created_at, amount, category, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(e["id"], e["group_id"], e["created_at"], e["amount"], e["category"], json.dumps(e))
+                     for e in expenses]
+                )
+            except sqlite3.IntegrityError:
+                raise KeyError("Batch contains an existing or duplicate expense id")
+
+            for group_id, group_expenses in _by_group(expenses).items():
+                conn.execute(
+                    "UPDATE groups SET total_expenses = total_expenses + ?, total_amount = total_amount + ? "
+                    "WHERE id = ?",
+                    (len(group_expenses), sum(e["amount"] for e in group_expenses), group_id)
+                )
+
+                category_amounts: Dict[str, float] = {}
+                for expense in group_expenses:
+                    category = expense["category"]
+                    category_amounts[category] = category_amounts.get(category, 0) + expense["amount"]
+                conn.executemany(
+                    "INSERT INTO category_totals (group_id, category, amount) VALUES (?, ?, ?) "
+                    "ON CONFLICT (group_id, category) DO UPDATE SET amount = amount + excluded.amount",
+                    [(group_id, category, amount) for category, amount in category_amounts.items()]
+                )
+
+                deltas = SettlementOptimizer.calculate_balances([settlement_view(e) for e in group_expenses])
+                conn.executemany(
+                    "INSERT INTO balances (group_id, user_id, cents) VALUES (?, ?, ?) "
+                    "ON CONFLICT (group_id, user_id) DO UPDATE SET cents = cents + excluded.cents",
+                    [(group_id, user_id, cents) for user_id, cents in deltas.items()]
+                )
+
+    def get_expense(self, expense_id: str) -> Optional[Dict]:
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT data FROM expenses WHERE id = ?", (expense_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def group_expenses(self, group_id: str, newest_first: bool = False) -> List[Dict]:
+        order = "DESC" if newest_first else "ASC"
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                f"SELECT data FROM expenses WHERE group_id = ? ORDER BY id {order}", (group_id,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def iter_group_expenses(self, group_id: str, newest_first: bool = False) -> Iterator[Dict]:
+        """Yield a group's expenses in chunks, holding a connection only per chunk"""
+        if newest_first:
+            # Later rows sort above the first chunk, so they are never reached
+            sql = "SELECT id, data FROM expenses WHERE group_id = ? AND id < ? ORDER BY id DESC LIMIT ?"
+            params = [group_id, "\uffff", self.STREAM_CHUNK]
+        else:
+            with self.pool.connection() as conn:
+                high = conn.execute(
+                    "SELECT MAX(id) FROM expenses WHERE group_id = ?", (group_id,)
+                ).fetchone()[0]
+            if high is None:
+                return
+            sql = "SELECT id, data FROM expenses WHERE group_id = ? AND id > ? AND id <= ? ORDER BY id LIMIT ?"
+            params = [group_id, "", high, self.STREAM_CHUNK]
+
+        while True:
+            with self.pool.connection() as conn:
+                rows = conn.execute(sql, params).fetchall()
+            for _, data in rows:
+                yield json.loads(data)
+            if len(rows) < self.STREAM_CHUNK:
+                return
+            params[1] = rows[-1][0]
+
+    def group_page(self, group_id: str, limit: int, after_id: Optional[str] = None,
+                   newest_first: bool = True) -> Tuple[List[Dict], Optional[str]]:
+        with self.pool.connection() as conn:
+            if after_id is not None and conn.execute(
+                "SELECT 1 FROM expenses WHERE id = ? AND group_id = ?", (after_id, group_id)
+            ).fetchone() is None:
+                raise KeyError(f"Expense {after_id} not in group {group_id}")
+
+            if newest_first:
+                sql = "SELECT id, data FROM expenses WHERE group_id = ? AND id < ? ORDER BY id DESC LIMIT ?"
+                bound = after_id if after_id is not None else "\uffff"
+            else:
+                sql = "SELECT id, data FROM expenses WHERE group_id = ? AND id > ? ORDER BY id LIMIT ?"
+                bound = after_id if after_id is not None else ""
+            # One extra row tells whether another page follows
+            rows = conn.execute(sql, (group_id, bound, limit + 1)).fetchall()
+
+        more = len(rows) > limit
+        rows = rows[:limit]
+        page = [json.loads(data) for _, data in rows]
+        return page, (rows[-1][0] if more else None)
+
+    def group_count(self, group_id: str) -> int:
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM expenses WHERE group_id = ?", (group_id,)).fetchone()[0]
+
+    def category_totals(self, group_id: str) -> Dict[str, float]:
+        with self.pool.connection() as conn:
+            return dict(conn.execute(
+                "SELECT category, amount FROM category_totals WHERE group_id = ?", (group_id,)
+            ).fetchall())
+
+    # Balances (integer cents)
+
+    def balances(self, group_id: str) -> Dict[str, int]:
+        with self.pool.connection() as conn:
+            return dict(conn.execute(
+                "SELECT user_id, cents FROM balances WHERE group_id = ?", (group_id,)
+            ).fetchall())
+
+    def reset_balances(self, group_id: str, balances: Dict[str, int]):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM balances WHERE group_id = ?", (group_id,))
+            conn.executemany(
+                "INSERT INTO balances (group_id, user_id, cents) VALUES (?, ?, ?)",
+                [(group_id, user_id, cents) for user_id, cents in balances.items()]
+            )
+
+    # Scan jobs
+
+    def save_job(self, job: Dict, ttl_seconds: float):
+        """Publish a scan job record so every worker process can answer polls for it"""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM scan_jobs WHERE expires_at <= ?", (now,))
+            conn.execute(
+                "INSERT OR REPLACE INTO scan_jobs (id, data, expires_at) VALUES (?, ?, ?)",
+                (job["id"], json.dumps(job), now + ttl_seconds)
+            )
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT data FROM scan_jobs WHERE id = ? AND expires_at > ?", (job_id, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+def _by_group(expenses: List[Dict]) -> Dict[str, List[Dict]]:
+    by_group: Dict[str, List[Dict]] = {}
+    for expense in expenses:
+        by_group.setdefault(expense["group_id"], []).append(expense)
+    return by_group
+
+
+def create_repository(backend: Optional[str] = None, path: Optional[str] = None):
+    """Build the repository selected by STORAGE_BACKEND (sqlite or memory)"""
+    backend = backend or os.getenv("STORAGE_BACKEND", "sqlite")
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend: {backend}")
+    if backend == "memory":
+        return MemoryRepository()
+    return SQLiteRepository(
+        path or os.getenv("STORAGE_PATH", "splitwise.db"),
+        pool_size=int(os.getenv("STORAGE_POOL_SIZE", "8"))
+    )
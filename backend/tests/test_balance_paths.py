@@ -0,0 +1,81 @@
+"""The scalar and NumPy balance paths must agree to the cent."""
+import random
+
+import pytest
+
+import settlement_optimizer
+from settlement_optimizer import SettlementOptimizer, VECTORIZE_MIN_EXPENSES
+
+scalar = SettlementOptimizer.calculate_balances_scalar
+vectorized = SettlementOptimizer.calculate_balances_vectorized
+
+
+def random_expense(rng: random.Random, members: list) -> dict:
+    return {
+        "paid_by": rng.choice(members + [None, ""]),
+        "amount": rng.choice([0, -5, 0.004, 0.005, 0.015, 1, rng.randint(1, 10_000_000) / 100]),
+        "split_between": [rng.choice(members) for _ in range(rng.randint(0, 8))]
+    }
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_histories_match(seed):
+    # Empty splits, zero/negative amounts, duplicate participants and amounts that round to nothing
+    rng = random.Random(seed)
+    for _ in range(200):
+        members = [f"user_{rng.randint(0, 60)}" for _ in range(rng.randint(1, 15))]
+        expenses = [random_expense(rng, members) for _ in range(rng.randint(0, 80))]
+        expected = scalar(expenses)
+        assert vectorized(expenses) == expected
+        assert sum(expected.values()) == 0
+
+
+@pytest.mark.parametrize("amount, split_between, expected", [
+    # 1000 cents over 3: the first id in sorted order gets the extra cent
+    (10.00, ["c", "a", "b"], {"p": 1000, "a": -334, "b": -333, "c": -333}),
+    # 2 leftover cents go to the first two ids, whatever the submitted order
+    (0.05, ["z", "y", "x"], {"p": 5, "x": -2, "y": -2, "z": -1}),
+    # Fewer cents than participants
+    (0.02, ["d", "c", "b", "a"], {"p": 2, "a": -1, "b": -1, "c": 0, "d": 0}),
+    # The payer in the split nets their own share; "a" sorts first and gets the cent
+    (1.00, ["p", "a", "b"], {"p": 67, "a": -34, "b": -33}),
+])
+def test_remainder_cents(amount, split_between, expected):
+    expenses = [{"paid_by": "p", "amount": amount, "split_between": split_between}]
+    assert scalar(expenses) == expected
+    assert vectorized(expenses) == expected
+
+
+def test_remainder_follows_sorted_ids_in_a_mixed_history():
+    expenses = [
+        {"paid_by": "b", "amount": 0.10, "split_between": ["c", "b", "a"]},
+        {"paid_by": "a", "amount": 0.07, "split_between": ["b", "c"]},
+        {"paid_by": "c", "amount": 0.01, "split_between": ["c", "b", "a"]},
+    ]
+    # "a" takes the leftover cent of the first and last expense, "b" that of the second
+    expected = {"a": 7 - 4 - 1, "b": 10 - 3 - 4, "c": 1 - 3 - 3}
+    assert scalar(expenses) == expected
+    assert vectorized(expenses) == expected
+
+
+def test_dispatch_is_identical_on_both_sides_of_the_threshold(monkeypatch):
+    rng = random.Random(11)
+    members = [f"user_{i}" for i in range(40)]
+    expenses = []
+    for _ in range(VECTORIZE_MIN_EXPENSES + 1):
+        split_between = rng.sample(members, rng.randint(2, 10))
+        expenses.append({
+            "paid_by": rng.choice(split_between),
+            "amount": rng.randint(1, 1_000_000) / 100,
+            "split_between": split_between
+        })
+
+    below = SettlementOptimizer.calculate_balances(expenses[:VECTORIZE_MIN_EXPENSES - 1])
+    assert below == vectorized(expenses[:VECTORIZE_MIN_EXPENSES - 1])
+
+    calls = []
+    monkeypatch.setattr(settlement_optimizer.SettlementOptimizer, "calculate_balances_vectorized",
+                        staticmethod(lambda e: calls.append(len(e)) or vectorized(e)))
+    at_threshold = SettlementOptimizer.calculate_balances(expenses[:VECTORIZE_MIN_EXPENSES])
+    assert calls == [VECTORIZE_MIN_EXPENSES]
+    assert at_threshold == scalar(expenses[:VECTORIZE_MIN_EXPENSES])
@@ -0,0 +1,59 @@
+"""
+Importing the API must stay fast and must not pull in the OCR or embedding stack.
+
+Each probe imports main in a fresh interpreter; benchmarks/import_budget.py
+prints an import-time profile when this fails.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+import pytest
+
+from conftest import BACKEND_DIR
+
+# Modules that may only be imported on the first scan, warm-up or model load
+DEFERRED_MODULES = ["torch", "transformers", "cv2", "easyocr", "sentence_transformers"]
+
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1000"))
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import main
+elapsed = time.perf_counter() - started
+print(json.dumps({
+    "ms": elapsed * 1000,
+    "loaded": [name for name in %r if name in sys.modules]
+}))
+""" % (DEFERRED_MODULES,)
+
+
+def run_probe() -> dict:
+    # Memory storage keeps the probe from creating a database file
+    env = dict(os.environ, STORAGE_BACKEND="memory", CATEGORIZER_USE_LLM="false")
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=BACKEND_DIR, env=env,
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        pytest.skip(f"main cannot be imported here: {result.stderr.strip().splitlines()[-1]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.fixture(scope="module")
+def probes():
+    # The first run also warms the bytecode cache and is not counted
+    return [run_probe() for _ in range(4)][1:]
+
+
+def test_heavy_modules_are_not_imported(probes):
+    loaded = sorted({name for probe in probes for name in probe["loaded"]})
+    assert loaded == [], f"imported at startup: {', '.join(loaded)}"
+
+
+def test_import_time_within_budget(probes):
+    median_ms = statistics.median(probe["ms"] for probe in probes)
+    assert median_ms <= IMPORT_BUDGET_MS, f"import main took {median_ms:.0f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)"
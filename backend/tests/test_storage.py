@@ -0,0 +1,30 @@
+import pytest
+
+from storage import MemoryRepository
+
+
+def expense(expense_id: str, group_id: str) -> dict:
+    return {
+        "id": expense_id,
+        "group_id": group_id,
+        "amount": 10.0,
+        "category": "Food & Groceries",
+        "paid_by_user_id": "u1",
+        "split_among_user_ids": ["u1", "u2"]
+    }
+
+
+def test_memory_batch_with_unknown_group_writes_nothing():
+    repository = MemoryRepository()
+    repository.create_group({
+        "id": "group_a", "name": "A", "created_at": "2026-01-01T00:00:00",
+        "total_expenses": 0, "total_amount": 0, "members": []
+    })
+
+    with pytest.raises(KeyError):
+        repository.add_expenses([expense("exp_1", "group_a"), expense("exp_2", "group_missing")])
+
+    assert repository.get_expense("exp_1") is None
+    assert repository.group_count("group_a") == 0
+    assert repository.balances("group_a") == {}
+    assert repository.get_group("group_a")["total_expenses"] == 0
@@ -0,0 +1,76 @@
+import json
+from typing import Iterable
+
+from fastapi import HTTPException, UploadFile
+
+# Multipart framing and the small form fields sent with the image
+FORM_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadLimitMiddleware:
+    """ASGI middleware capping request bodies on the given paths.
+
+    A Content-Length over the limit is refused with 413 before anything is
+    read. Otherwise (e.g. chunked transfer encoding) the bytes are counted
+    as the multipart parser pulls them and the request fails with 413 as
+    soon as the limit is passed, so an oversized upload is never spooled
+    in full.
+    """
+
+    def __init__(self, app, paths: Iterable[str], max_bytes: int):
+        self.app = app
+        self.paths = frozenset(paths)
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length" and value.isdigit() and int(value) > self.max_bytes:
+                await self._reject(send)
+                return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise HTTPException(status_code=413, detail=self.detail())
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    def detail(self) -> str:
+        return f"Upload too large (limit {self.max_bytes // 1024} KB)"
+
+    async def _reject(self, send):
+        body = json.dumps({"detail": self.detail()}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+async def read_upload(file: UploadFile, max_bytes: int, chunk_size: int = 256 * 1024) -> bytes:
+    """Read an uploaded file in chunks, failing with 413 once it passes max_bytes"""
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Image too large (limit {max_bytes // 1024} KB)")
+
+    chunks = []
+    total = 0
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Image too large (limit {max_bytes // 1024} KB)")
+        chunks.append(chunk)
+    return b"".join(chunks)